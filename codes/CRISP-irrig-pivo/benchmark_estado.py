@@ -0,0 +1,55 @@
+from modelo import setores, obstaculos, parametros, estado_inicial, atualizar_estado
+import numpy as np
+import copy
+import sys
+import time
+import tracemalloc
+
+"""
+Mede um tick de atualizar_estado: tempo médio, blocos de memória que ficam vivos no estado retornado
+e pico de memória alocada durante o tick (tracemalloc).
+"""
+
+n_ticks_tempo = 3000
+n_ticks_memoria = 200
+n_aquecimento = 50   # monta tabelas/caches antes de medir
+
+
+def tick(estado, setores_sim):
+    return atualizar_estado(estado, setores_sim, obstaculos, parametros)
+
+
+def medir():
+    np.random.seed(0)
+    setores_sim = copy.deepcopy(setores)
+    estado = copy.deepcopy(estado_inicial)
+    for _ in range(n_aquecimento):
+        estado = tick(estado, setores_sim)
+
+    inicio = time.perf_counter()
+    for _ in range(n_ticks_tempo):
+        estado = tick(estado, setores_sim)
+    tempo_tick = (time.perf_counter() - inicio) / n_ticks_tempo
+
+    blocos = []
+    picos = []
+    tracemalloc.start()
+    for _ in range(n_ticks_memoria):
+        blocos_antes = sys.getallocatedblocks()
+        atual, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        novo = tick(estado, setores_sim)
+        picos.append(tracemalloc.get_traced_memory()[1] - atual)
+        blocos.append(sys.getallocatedblocks() - blocos_antes)
+        estado = novo
+        del novo
+    tracemalloc.stop()
+
+    print(f"Tempo por tick:           {tempo_tick * 1e6:8.1f} us ({1 / tempo_tick:.0f} ticks/s)")
+    print(f"Blocos novos por tick:    {np.median(blocos):8.0f} (estado retornado, mediana)")
+    print(f"Pico alocado no tick:     {np.median(picos) / 1024:8.1f} KiB (mediana)")
+    return tempo_tick, np.median(blocos), np.median(picos)
+
+
+if __name__ == '__main__':
+    medir()
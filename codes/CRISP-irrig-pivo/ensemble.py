@@ -0,0 +1,112 @@
+from modelo import setores, obstaculos, parametros, estado_inicial, atualizar_estado
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import copy
+import time
+
+"""
+Monte Carlo do pivô: várias réplicas independentes da mesma temporada, em processos separados.
+
+O modelo tem ruído nos sensores, no torque e chuva aleatória, então uma rodada só não diz muito sobre o consumo
+esperado. Cada réplica recebe o seu numpy.random.Generator, criado de um filho de SeedSequence(semente).spawn,
+então o resultado não depende de quantos processos rodam nem da ordem em que terminam
+(num_workers = 0 roda tudo em série e dá o mesmo resultado).
+
+Cenários de clima mudam parâmetros do modelo (por enquanto a probabilidade de chuva por passo).
+Saída: faixas de percentis do consumo total, das horas em modo de emergência e da umidade de cada setor ao longo do tempo.
+"""
+
+n_replicas = 200
+dias_simulados = 90
+semente = 2025
+num_workers = None        # None = todos os núcleos; 0 = em série
+amostras_por_dia = 24     # resolução da trajetória de umidade guardada por réplica
+percentis = (5, 25, 50, 75, 95)
+arquivo_ensemble = 'ensemble_crisp.npz'
+
+cenarios = {
+    'normal': {},
+    'seco': {'prob_chuva': 0.002},
+    'chuvoso': {'prob_chuva': 0.03},
+}
+
+
+def simular_replica(tarefa):
+    """Uma réplica: (SeedSequence, parâmetros, n_passos, intervalo_amostra) -> dict com os resultados"""
+    semente_replica, parametros_replica, n_passos, intervalo_amostra = tarefa
+    rng = np.random.default_rng(semente_replica)
+    setores_sim = copy.deepcopy(setores)
+    estado = copy.deepcopy(estado_inicial)
+    dt_real = parametros_replica['dt'] * parametros_replica['fator_aceleracao_tempo']
+
+    n_amostras = n_passos // intervalo_amostra
+    umidades = np.empty((n_amostras, len(setores_sim)))
+    consumo = np.empty(n_amostras)
+    passos_emergencia = 0
+
+    for i in range(n_passos):
+        estado = atualizar_estado(estado, setores_sim, obstaculos, parametros_replica, rng)
+        passos_emergencia += estado['modo_emergencia']
+        if (i + 1) % intervalo_amostra == 0:
+            k = (i + 1) // intervalo_amostra - 1
+            umidades[k] = setores_sim['umidade']
+            consumo[k] = estado['consumo_agua_total']
+
+    return {'consumo_agua_total': estado['consumo_agua_total'],
+            'horas_emergencia': passos_emergencia * dt_real / 3600.0,
+            'umidades': umidades,
+            'consumo': consumo}
+
+
+def rodar_ensemble(n_replicas, dias, semente, parametros_cenario=None, num_workers=None):
+    """Roda n_replicas réplicas e devolve os resultados empilhados (réplica na primeira dimensão)"""
+    parametros_replica = dict(parametros, **(parametros_cenario or {}))
+    dt_real = parametros_replica['dt'] * parametros_replica['fator_aceleracao_tempo']
+    n_passos = int(np.ceil(dias * 24 * 3600 / dt_real))
+    intervalo_amostra = max(1, int(round(24 * 3600 / dt_real / amostras_por_dia)))
+
+    sementes = np.random.SeedSequence(semente).spawn(n_replicas)
+    tarefas = [(s, parametros_replica, n_passos, intervalo_amostra) for s in sementes]
+
+    if num_workers == 0:
+        resultados = [simular_replica(t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            resultados = list(executor.map(simular_replica, tarefas))
+
+    empilhado = {chave: np.array([r[chave] for r in resultados]) for chave in resultados[0]}
+    empilhado['horas'] = np.arange(1, empilhado['consumo'].shape[1] + 1) * intervalo_amostra * dt_real / 3600.0
+    return empilhado
+
+
+def faixas_percentis(resultado, percentis=percentis):
+    """Percentis entre réplicas: escalares viram (len(percentis),), trajetórias (len(percentis), tempo[, setor])"""
+    return {chave: np.percentile(resultado[chave], percentis, axis=0)
+            for chave in ('consumo_agua_total', 'horas_emergencia', 'umidades', 'consumo')}
+
+
+def imprimir_resumo(nome, faixas, nomes_setores):
+    rotulo = ' / '.join(f'P{p}' for p in percentis)
+    print(f"\n=== Cenário {nome} ({rotulo}) ===")
+    print("Consumo total (L):     " + ' / '.join(f'{v:.3e}' for v in faixas['consumo_agua_total']))
+    print("Horas em emergência:   " + ' / '.join(f'{v:.1f}' for v in faixas['horas_emergencia']))
+    for j, nome_setor in enumerate(nomes_setores):
+        print(f"Umidade final setor {nome_setor}: " + ' / '.join(f'{v:.3f}' for v in faixas['umidades'][:, -1, j]))
+
+
+if __name__ == '__main__':
+    salvar = {'percentis': np.array(percentis)}
+    for nome, parametros_cenario in cenarios.items():
+        inicio = time.perf_counter()
+        resultado = rodar_ensemble(n_replicas, dias_simulados, semente, parametros_cenario, num_workers)
+        duracao = time.perf_counter() - inicio
+        faixas = faixas_percentis(resultado)
+        imprimir_resumo(nome, faixas, setores['nome'])
+        print(f"{n_replicas} réplicas x {dias_simulados} dias em {duracao:.1f} s")
+
+        salvar[f'{nome}_horas'] = resultado['horas']
+        for chave, valor in faixas.items():
+            salvar[f'{nome}_{chave}'] = valor
+
+    np.savez(arquivo_ensemble, **salvar)
+    print(f"\nFaixas salvas em {arquivo_ensemble}")
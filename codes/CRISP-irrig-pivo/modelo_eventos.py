@@ -0,0 +1,243 @@
+import numpy as np
+import copy
+import math
+import time
+from scipy.signal import lfilter
+from input.perfil_terreno import get_declive
+from modelo import (setores, obstaculos, parametros, estado_inicial, atualizar_estado, geometria_braco,
+                    TAU_PRESSAO_PADRAO)
+
+"""
+Relógio por eventos para o modelo CRISP: entre dois eventos o passo fixo é integrado em forma fechada, e
+atualizar_estado só roda nos passos dos eventos.
+
+Dado o fator de controle de cada passo, um passo fixo são recorrências lineares:
+    pressão:     p[k] = r_p p[k-1] + (1 - r_p) p_d[k], r_p = exp(-dt / tau_pressao)   -> filtro de primeira ordem
+    velocidade:  v[k] = v_d + (v0 - v_d) r^k, r = 1 - 200 h / J (o ruído da resistência se cancela no torque
+                 enquanto o motor não satura)
+    ângulo:      a[k+1] = a[k] + h (v[k] + v[k+1])     -> soma das duas séries geométricas
+    umidade do setor atual: u[k] = min(capacidade, u[k-1] exp(-perda[k]) + irrigação[k])
+                 -> exp(-soma acumulada das perdas); perda[k] vem da hora do dia, irrigação[k] da vazão em p[k]
+e o consumo é a soma das vazões. O fator de controle é o valor esperado de controle_crisp com o ruído do sensor
+(normal truncada pelos limites 0.1 e 1, em forma fechada), então o trecho segue a média do passo fixo. Como ele
+depende da umidade, que depende da vazão, a trajetória é calculada em passadas_controle passadas.
+
+O trecho termina no primeiro destes eventos: troca de setor, chuva (sorteada como tempo até a próxima, geométrico
+com prob_chuva por passo), o fator de controle esperado andar mais que tolerancia_controle, a umidade média cruzar
+o limite de emergência, o pior caso do torque saturar o motor, ou o fim da simulação. O passo do evento é um
+atualizar_estado normal, com ruído. A chuva vem só desse relógio: os passos normais rodam com prob_chuva = 0 e o
+passo da chuva com prob_chuva = 1.
+"""
+
+dias_simulados = 30.0
+semente = 0
+tolerancia_controle = 0.05  # variação máxima do fator de controle dentro de um trecho
+passos_max_trecho = 2000
+passadas_controle = 3
+margem_ruido = 4.0          # desvios padrão do ruído da resistência no pior caso do torque
+resistencia_solo = np.array([1.0, 1.2, 1.4, 1.8])
+
+
+def controle_crisp_esperado(umidade, capacidade, desvio_sensor=0.01):
+    """E[controle_crisp(umidade + ruído, capacidade)] com ruído N(0, desvio_sensor); aceita arrays de umidade"""
+    # controle = clip(1.2 - 1.5 (umidade + ruído) / capacidade, 0.1, 1.0): normal de média mu e desvio s, truncada
+    mu = 1.2 - 1.5 * np.asarray(umidade) / capacidade
+    s = 1.5 * desvio_sensor / capacidade
+    a = (0.1 - mu) / s
+    b = (1.0 - mu) / s
+    phi = lambda z: np.exp(-0.5 * z**2) / math.sqrt(2 * math.pi)
+    Phi = lambda z: 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+    return 0.1 * Phi(a) + 1.0 * (1 - Phi(b)) + mu * (Phi(b) - Phi(a)) + s * (phi(a) - phi(b))
+
+
+def vazao_total_pressao(pressoes, fator_controle, parametros):
+    """Vazão total do braço para um array de pressões na bomba e fator de controle (escalar ou um por pressão)"""
+    posicoes_aspersores, _ = geometria_braco(parametros["comprimento_braco"], parametros["num_aspersores"])
+    pressoes_aspersores = np.maximum(2.0, pressoes[:, None] - parametros["perda_pressao_por_metro"] * posicoes_aspersores)
+    fator_posicao = 0.8 + 0.2 * (posicoes_aspersores / parametros["comprimento_braco"])
+    vazoes = parametros["vazao_por_aspersor_max"] * np.sqrt(pressoes_aspersores / 6.0) * fator_posicao
+    return fator_controle * vazoes.sum(axis=1)
+
+
+def taxa_perda_passos(tempos, perda, parametros):
+    """Expoente da perda de umidade em cada passo (taxa_perda * dt_real / 3600), tempos em minutos"""
+    dt_real = parametros["dt"] * parametros["fator_aceleracao_tempo"]
+    horas_totais = tempos / 60.0
+    dias_do_ano = (horas_totais // 24) % 365
+    temp_sazonal = 5.0 * np.sin(2 * np.pi * (dias_do_ano - 172) / 365)
+    temperatura = 25.0 + temp_sazonal + 10.0 * np.sin(2 * np.pi * (horas_totais - 6) / 24)
+    vento = 1.0 + 0.5 * np.sin(2 * np.pi * (horas_totais - 10) / 24)
+    radiacao = 1.0 + 0.5 * np.sin(2 * np.pi * (horas_totais - 12) / 24)
+    fator_temp = 1.0 + 0.03 * (temperatura - 25.0)
+    return perda * fator_temp * vento * radiacao * dt_real / 3600
+
+
+def trecho_calmo(estado, setores, parametros, limite):
+    """
+    Integra até `limite` passos em forma fechada a partir de `estado`, parando antes do primeiro evento.
+    Retorna (n, novo estado, nova umidade do setor atual, índice do setor); n = 0 se nem um passo dá para pular.
+    """
+    limite = min(limite, passos_max_trecho)
+    dt_real = parametros["dt"] * parametros["fator_aceleracao_tempo"]
+    h = dt_real / 60
+    J = parametros["J"]
+    pressao_bomba_max = parametros["pressao_bomba_max"]
+    r_vel = 1.0 - 200.0 * h / J
+    if limite < 1 or r_vel <= 0.0:
+        return 0, None, None, None
+
+    ang = estado["ang_atual"]
+    vel = estado["vel_angular"]
+    emergencia = setores["umidade"].mean() < 0.20
+    vel_desejada = 0.2 if emergencia else 0.6
+
+    # a velocidade anda monotonamente para v_d, então o limite [0.05, 2] de atualizar_estado só atua no primeiro passo
+    if not 0.05 <= vel_desejada + (vel - vel_desejada) * r_vel <= 2.0:
+        return 0, None, None, None
+
+    # troca de setor: o trecho inteiro fica no setor em que o primeiro meio passo cai
+    vel_max = max(vel, vel_desejada)
+    ang_inicio = (ang + vel * h) % 360
+    setor_idx = int(ang_inicio // 90)
+    n = int(min(limite, (90.0 * (setor_idx + 1) - ang_inicio) / (2 * vel_max * h) - 1))
+    if n < 1:
+        return 0, None, None, None
+
+    setor = setores[setor_idx]
+    capacidade = setor["capacidade"]
+    umidade0 = setor["umidade"]
+    k = np.arange(1, n + 1)
+    perda = taxa_perda_passos(estado["tempo_simulacao_total"] + k * h, setor["perda"], parametros)
+    produto = np.exp(-np.cumsum(perda))
+    r_p = np.exp(-dt_real / parametros.get("tau_pressao", TAU_PRESSAO_PADRAO))
+
+    # o fator de cada passo vem da umidade do passo anterior, que depende da vazão: a primeira passada usa o fator
+    # do início do trecho e as seguintes o fator da trajetória de umidade da passada anterior
+    fator0 = float(controle_crisp_esperado(umidade0, capacidade))
+    fatores = np.full(n, fator0)
+    for _ in range(passadas_controle):
+        pressoes_desejadas = np.full(n, pressao_bomba_max) if emergencia else 3.0 + (pressao_bomba_max - 3.0) * fatores
+        # p[k] = r_p p[k-1] + (1 - r_p) p_d[k], começando de p0
+        pressoes, _ = lfilter([1.0 - r_p], [1.0, -r_p], pressoes_desejadas, zi=[r_p * estado["pressao_atual"]])
+        vazoes = vazao_total_pressao(pressoes, fatores, parametros)
+        irrigacao = (vazoes * h) / (setor["area_ha"] * 1000) * 0.001
+
+        # umidade sem o min(capacidade): u[k] = P[k] (u0 + soma(irrigação[j] / P[j])), P = exp(-soma das perdas)
+        umidades = produto * (umidade0 + np.cumsum(irrigacao / produto))
+        na_capacidade = umidades >= capacidade
+        if na_capacidade.any():
+            # depois de chegar na capacidade fica nela, desde que a irrigação de cada passo cubra a perda
+            primeiro = int(np.argmax(na_capacidade))
+            umidades[primeiro:] = capacidade
+            cobre = irrigacao[primeiro:] >= -np.expm1(-perda[primeiro:]) * capacidade
+            if not cobre.all():
+                n = min(n, primeiro + int(np.argmin(cobre)))
+        fatores = controle_crisp_esperado(np.concatenate(([umidade0], umidades[:-1])), capacidade)
+
+    # fator de controle andando mais que a tolerância
+    muda = np.abs(fatores[:n] - fator0) > tolerancia_controle
+    if muda.any():
+        n = min(n, int(np.argmax(muda)))
+    # umidade média cruzando o limite de emergência
+    outras = setores["umidade"].sum() - umidade0
+    cruza = ((outras + umidades[:n]) / len(setores) < 0.20) != emergencia
+    if cruza.any():
+        n = min(n, int(np.argmax(cruza)))
+    if n < 1:
+        return 0, None, None, None
+
+    # torque sem saturar no pior caso da resistência ao longo do trecho
+    dias_fim = int((estado["tempo_simulacao_total"] + n * h) / 60.0 // 24)
+    declive_max = np.abs(get_declive(np.linspace(ang, ang + 2 * n * vel_max * h, 32),
+                                     parametros["comprimento_braco"])).max()
+    resistencia_max = (parametros["resistencia_base"] * resistencia_solo[setor_idx] * (1.0 + 0.05 * dias_fim)
+                       * (1.0 + margem_ruido * 0.05) * (1.5 if capacidade > 0.9 else 1.0) + 0.5 * vel_max)
+    resistencia_max = resistencia_max * (1.0 + declive_max / 30.0) + 0.3 * (vazoes[:n].max() / 100)
+    if 200.0 * abs(vel_desejada - vel) + resistencia_max > parametros["torque_motor_max"]:
+        return 0, None, None, None
+
+    # velocidade e ângulo: v[k] = v_d + e0 r^k; o ângulo soma h (v[k] + v[k+1]) para k = 0..n-1
+    e0 = vel - vel_desejada
+    soma_0 = (1 - r_vel**n) / (1 - r_vel)
+    soma_1 = r_vel * soma_0
+
+    novo = dict(estado)
+    novo["ang_atual"] = (ang + h * (2 * n * vel_desejada + e0 * (soma_0 + soma_1))) % 360
+    novo["vel_angular"] = vel_desejada + e0 * r_vel**n
+    novo["aceleracao"] = -200.0 * e0 * r_vel**(n - 1) / J
+    novo["pressao_atual"] = pressoes[n - 1]
+    novo["consumo_agua_total"] = estado["consumo_agua_total"] + vazoes[:n].sum() * h
+    novo["tempo_no_setor"] = estado["tempo_no_setor"] + n * h
+    novo["tempo_simulacao_total"] = estado["tempo_simulacao_total"] + n * h
+    return n, novo, umidades[n - 1], setor_idx
+
+
+def simular_eventos(n_passos, setores, obstaculos, parametros, estado=None, rng=None, callback=None):
+    """
+    Avança n_passos passos de dt*fator_aceleracao_tempo, integrando em forma fechada entre os eventos.
+    setores é alterado no lugar, como em atualizar_estado.
+    callback(estado, passo), se dado, é chamado depois de cada atualizar_estado (passo = índice do passo fixo).
+    Retorna (estado, número de chamadas de atualizar_estado).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    estado = copy.deepcopy(estado_inicial) if estado is None else estado
+    prob_chuva = parametros.get("prob_chuva", 0.01)
+    sem_chuva = dict(parametros, prob_chuva=0.0)
+    com_chuva = dict(parametros, prob_chuva=1.0)
+
+    def sortear_chuva():
+        return rng.geometric(prob_chuva) if prob_chuva > 0 else np.inf
+
+    ate_chuva = sortear_chuva()    # passos até o próximo passo com chuva, contando ele
+    passo = 0
+    chamadas = 0
+    while passo < n_passos:
+        limite = min(n_passos - passo, ate_chuva) - 1
+        n, novo, umidade, setor_idx = trecho_calmo(estado, setores, parametros, limite)
+        if n:
+            estado = novo
+            setores[setor_idx]["umidade"] = umidade
+            passo += n
+            ate_chuva -= n
+
+        chove = ate_chuva == 1
+        estado = atualizar_estado(estado, setores, obstaculos, com_chuva if chove else sem_chuva, rng)
+        chamadas += 1
+        passo += 1
+        ate_chuva = sortear_chuva() if chove else ate_chuva - 1
+        if callback is not None:
+            callback(estado, passo - 1)
+    return estado, chamadas
+
+
+def comparar(dias=dias_simulados, semente=semente, parametros=parametros):
+    """Passo fixo contra relógio por eventos nos mesmos dias; imprime passos, tempo e os valores finais"""
+    dt_real = parametros["dt"] * parametros["fator_aceleracao_tempo"]
+    n_passos = int(np.ceil(dias * 24 * 3600 / dt_real))
+
+    rng = np.random.default_rng(semente)
+    setores_fixo = copy.deepcopy(setores)
+    estado_fixo = copy.deepcopy(estado_inicial)
+    inicio = time.perf_counter()
+    for _ in range(n_passos):
+        estado_fixo = atualizar_estado(estado_fixo, setores_fixo, obstaculos, parametros, rng)
+    t_fixo = time.perf_counter() - inicio
+
+    setores_ev = copy.deepcopy(setores)
+    inicio = time.perf_counter()
+    estado_ev, chamadas = simular_eventos(n_passos, setores_ev, obstaculos, parametros,
+                                          rng=np.random.default_rng(semente))
+    t_ev = time.perf_counter() - inicio
+
+    print(f"{dias:g} dias, prob_chuva = {parametros.get('prob_chuva', 0.01)}")
+    print(f"Passo fixo: {n_passos} passos em {t_fixo:.2f} s")
+    print(f"Eventos:    {chamadas} chamadas de atualizar_estado em {t_ev:.2f} s ({n_passos / chamadas:.0f}x menos passos)")
+    for chave in ("ang_atual", "vel_angular", "pressao_atual", "consumo_agua_total", "tempo_simulacao_total"):
+        print(f"  {chave:22s} fixo {estado_fixo[chave]:14.6f}   eventos {estado_ev[chave]:14.6f}")
+    print("  umidades fixo   ", np.round(setores_fixo["umidade"], 4))
+    print("  umidades eventos", np.round(setores_ev["umidade"], 4))
+
+
+if __name__ == '__main__':
+    comparar(parametros=dict(parametros, prob_chuva=0.0))
+    comparar()
@@ -0,0 +1,171 @@
+import numpy as np
+import copy
+import time
+from input.perfil_terreno import get_declive
+from modelo import setores, parametros, estado_inicial, geometria_braco, TAU_PRESSAO_PADRAO
+
+"""
+Versão em lote do atualizar_estado: N pivôs (réplicas ou talhões diferentes) avançam juntos, um tick por chamada.
+
+Cada campo do estado vira um array (N,), e os setores um array estruturado (N, 4) com o mesmo dtype de
+modelo.setores, então cada pivô pode ter os seus setores (umidade, capacidade, perda, área). Sensores, controle
+crisp, atraso de primeira ordem da pressão, aspersores, torque e velocidade são as mesmas contas de
+modelo.atualizar_estado, só que elemento a elemento, na mesma ordem (inclusive o ângulo avançando duas vezes no tick).
+Com o ruído zerado, o pivô i do lote segue a mesma trajetória que atualizar_estado sozinho.
+"""
+
+resistencia_solo = np.array([1.0, 1.2, 1.4, 1.8])
+
+
+def criar_lote(n, setores=setores, estado_inicial=estado_inicial):
+    """Estado (dict de arrays (n,)) e setores (n, 4) com n cópias do estado e dos setores dados"""
+    estado = {chave: np.full(n, valor) for chave, valor in estado_inicial.items()}
+    setores_lote = np.tile(copy.deepcopy(setores), (n, 1))
+    return estado, setores_lote
+
+
+def atualizar_estado_lote(estado, setores, parametros, rng=None):
+    """
+    Um tick para os N pivôs. estado: dict de arrays (N,); setores: array estruturado (N, 4), alterado no lugar
+    como o atualizar_estado faz com a lista de setores. Retorna o novo estado, também com arrays (N,) ou (N, k).
+    """
+    rng = np.random if rng is None else rng
+    J = parametros["J"]
+    torque_motor_max = parametros["torque_motor_max"]
+    resistencia_base = parametros["resistencia_base"]
+    dt = parametros["dt"]
+    fator_aceleracao_tempo = parametros["fator_aceleracao_tempo"]
+    comprimento_braco = parametros["comprimento_braco"]
+    num_aspersores = parametros["num_aspersores"]
+    vazao_por_aspersor_max = parametros["vazao_por_aspersor_max"]
+    pressao_bomba_max = parametros["pressao_bomba_max"]
+    perda_pressao_por_metro = parametros["perda_pressao_por_metro"]
+    prob_chuva = parametros.get("prob_chuva", 0.01)
+    posicoes_aspersores, posicoes_motores = geometria_braco(comprimento_braco, num_aspersores)
+
+    ang_atual = estado["ang_atual"]
+    vel_angular = estado["vel_angular"]
+    consumo_agua_total = estado["consumo_agua_total"]
+    pressao_atual = estado["pressao_atual"]
+    tempo_no_setor = estado["tempo_no_setor"]
+    tempo_simulacao_total = estado["tempo_simulacao_total"]
+    n = len(ang_atual)
+    linhas = np.arange(n)
+
+    declives_motores = get_declive(ang_atual[:, None], comprimento_braco=posicoes_motores[None, :])
+    motores_ligado = np.abs(declives_motores) > 8.0
+    motores_ligado[:, -1] = True
+    motores_ativos = motores_ligado.sum(axis=1)
+
+    dt_real = dt * fator_aceleracao_tempo
+    tempo_simulacao_total = tempo_simulacao_total + dt_real / 60.0
+
+    ang_atual = (ang_atual + vel_angular * dt_real / 60) % 360
+
+    horas_totais = tempo_simulacao_total / 60.0
+    dias_completos = (horas_totais // 24).astype(int)
+    hora_do_dia = horas_totais % 24
+
+    dias_do_ano = (dias_completos % 365)
+    temp_sazonal = 5.0 * np.sin(2 * np.pi * (dias_do_ano - 172) / 365)
+    temperatura_ambiente = 25.0 + temp_sazonal + 10.0 * np.sin(2 * np.pi * (horas_totais - 6) / 24)
+
+    setor_idx = ((ang_atual % 360) // 90).astype(int)
+    umidades = setores["umidade"]
+    capacidade = setores["capacidade"][linhas, setor_idx]
+
+    vento = 1.0 + 0.5 * np.sin(2 * np.pi * (horas_totais - 10) / 24)
+    radiacao = 1.0 + 0.5 * np.sin(2 * np.pi * (horas_totais - 12) / 24)
+    fator_temp = 1.0 + 0.03 * (temperatura_ambiente - 25.0)
+    taxa_perda = setores["perda"][linhas, setor_idx] * fator_temp * vento * radiacao
+    umidades[linhas, setor_idx] *= np.exp(-taxa_perda * dt_real / 3600)
+
+    chuva = rng.binomial(1, prob_chuva, n).astype(bool)
+    umidades[chuva] = np.minimum(setores["capacidade"][chuva], umidades[chuva] + 0.01)
+
+    umidade_sensor = np.clip(umidades[linhas, setor_idx] + rng.normal(0, 0.01, n), 0.0, 1.0)
+    fator_controle = np.clip(1.2 - (umidade_sensor / capacidade) * 1.5, 0.1, 1.0)
+
+    umidade_media = umidades.mean(axis=1)
+    modo_emergencia = umidade_media < 0.20
+
+    pressao_desejada = np.where(modo_emergencia, pressao_bomba_max,
+                                3.0 + (pressao_bomba_max - 3.0) * fator_controle)
+    pressao_atual = pressao_atual + (pressao_desejada - pressao_atual) * (1.0 - np.exp(-dt_real / parametros.get("tau_pressao", TAU_PRESSAO_PADRAO)))
+    pressao_atual = np.clip(pressao_atual, 3.0, pressao_bomba_max)
+    pressao_sensor = np.maximum(0.0, pressao_atual + rng.normal(0, 0.1, n))
+
+    pressoes_aspersores = np.maximum(2.0, pressao_atual[:, None] - perda_pressao_por_metro * posicoes_aspersores)
+    fator_posicao = 0.8 + 0.2 * (posicoes_aspersores / comprimento_braco)
+    vazoes_aspersores = np.where(pressoes_aspersores < 2.0, 0.0,
+                                 vazao_por_aspersor_max * np.sqrt(pressoes_aspersores / 6.0)
+                                 * fator_controle[:, None] * fator_posicao)
+    vazao_total = vazoes_aspersores.sum(axis=1)
+
+    irrigando = vazao_total > 0
+    lamina_aplicada_mm = (vazao_total * dt_real / 60.0) / (setores["area_ha"][linhas, setor_idx] * 1000)
+    umidade_irrigada = np.minimum(capacidade, umidades[linhas, setor_idx] + lamina_aplicada_mm * 0.001)
+    umidades[linhas, setor_idx] = np.where(irrigando, umidade_irrigada, umidades[linhas, setor_idx])
+    consumo_agua_total = consumo_agua_total + np.where(irrigando, vazao_total * dt_real / 60.0, 0.0)
+
+    declive_graus = get_declive(ang_atual, comprimento_braco)
+    declive_fator = 1.0 + np.abs(declive_graus) / 30.0
+    desgaste = 1.0 + 0.05 * dias_completos
+    variacao = 1.0 + rng.normal(0, 0.05, n)
+    solo_encharcado = 1.0 + 0.5 * (umidades[linhas, setor_idx] > 0.9)
+    resistencia_total = (resistencia_base * resistencia_solo[setor_idx] * desgaste * variacao * solo_encharcado
+                         + 0.5 * np.abs(vel_angular))
+    resistencia_total = resistencia_total * declive_fator + 0.3 * (vazao_total / 100)
+
+    vel_desejada = np.where(modo_emergencia, 0.2, 0.6)
+    erro_vel = vel_desejada - vel_angular
+    torque_motor = np.minimum(torque_motor_max, 200.0 * erro_vel + resistencia_total)
+
+    aceleracao = (torque_motor - resistencia_total) / J
+    vel_angular = np.clip(vel_angular + aceleracao * dt_real / 60, 0.05, 2.0)
+    ang_atual = (ang_atual + vel_angular * dt_real / 60) % 360
+
+    tempo_no_setor = np.where((ang_atual / 90).astype(int) != setor_idx, 0.0, tempo_no_setor + dt_real / 60)
+
+    return {
+        "ang_atual": ang_atual,
+        "vel_angular": vel_angular,
+        "aceleracao": aceleracao,
+        "consumo_agua_total": consumo_agua_total,
+        "temperatura_ambiente": temperatura_ambiente,
+        "modo_emergencia": modo_emergencia,
+        "pressao_atual": pressao_atual,
+        "tempo_no_setor": tempo_no_setor,
+        "tempo_simulacao_total": tempo_simulacao_total,
+        "umidade_media": umidade_media,
+        "dias_completos": dias_completos,
+        "hora_do_dia": hora_do_dia,
+        "pressao_desejada": pressao_desejada,
+        "pressao_sensor": pressao_sensor,
+        "setor_idx": setor_idx,
+        "vazoes_aspersores": vazoes_aspersores,
+        "pressoes_aspersores": pressoes_aspersores,
+        "vazao_total": vazao_total,
+        "torque_motor": torque_motor,
+        "declive": declive_graus,
+        "motores_declive": declives_motores,
+        "motores_ligado": motores_ligado,
+        "motores_ativos": motores_ativos
+    }
+
+
+def medir_vazao(tamanhos=(1, 10, 100, 1000, 10000), n_ticks=200, semente=0):
+    """Pivô-ticks por segundo para cada tamanho de lote"""
+    for n in tamanhos:
+        rng = np.random.default_rng(semente)
+        estado, setores_lote = criar_lote(n)
+        estado = atualizar_estado_lote(estado, setores_lote, parametros, rng)
+        inicio = time.perf_counter()
+        for _ in range(n_ticks):
+            estado = atualizar_estado_lote(estado, setores_lote, parametros, rng)
+        duracao = time.perf_counter() - inicio
+        print(f"N = {n:6d}: {n * n_ticks / duracao:12.0f} pivô-ticks/s ({duracao / n_ticks * 1e3:.2f} ms por tick)")
+
+
+if __name__ == '__main__':
+    medir_vazao()
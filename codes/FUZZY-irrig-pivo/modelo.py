@@ -1,13 +1,26 @@
 import numpy as np
+from functools import lru_cache
 from input.perfil_terreno import get_declive 
 from controlador_fuzzy import get_controle_fuzzy, get_controle_motor_fuzzy
 
-setores = [
-    {"nome": "A", "umidade": 0.30, "capacidade": 0.45, "perda": 2.0/3600, "tipo": "Argiloso", "area_ha": 11.31},
-    {"nome": "B", "umidade": 0.25, "capacidade": 0.40, "perda": 3.0/3600, "tipo": "Franco-argiloso", "area_ha": 11.31},
-    {"nome": "C", "umidade": 0.35, "capacidade": 0.35, "perda": 4.0/3600, "tipo": "Franco", "area_ha": 11.31},
-    {"nome": "D", "umidade": 0.20, "capacidade": 0.25, "perda": 6.0/3600, "tipo": "Arenoso", "area_ha": 11.31}
-]   
+# Setores, aspersores e motores ficam em arrays estruturados: setores[i]["umidade"] continua funcionando
+# (e altera o array), e setores["umidade"] dá a umidade de todos de uma vez
+dtype_setor = np.dtype([("nome", "U1"), ("umidade", "f8"), ("capacidade", "f8"), ("perda", "f8"),
+                        ("tipo", "U20"), ("area_ha", "f8")])
+
+setores = np.array([
+    ("A", 0.30, 0.45, 2.0/3600, "Argiloso", 11.31),
+    ("B", 0.25, 0.40, 3.0/3600, "Franco-argiloso", 11.31),
+    ("C", 0.35, 0.35, 4.0/3600, "Franco", 11.31),
+    ("D", 0.20, 0.25, 6.0/3600, "Arenoso", 11.31)
+], dtype=dtype_setor)
+
+NUM_MOTORES = 10
+
+dtype_motor = np.dtype([("pos", "f8"), ("declive", "f8"), ("ligado", "?"), ("ativacao_fuzzy", "f8")])
+
+# s; 10% do erro de pressão a cada 10 s, o antigo 0.1 por passo. Também é o padrão de parametros sem "tau_pressao"
+TAU_PRESSAO_PADRAO = -10.0 / np.log(0.9)
 
 parametros = {
     "J": 1500.0,
@@ -19,7 +32,9 @@ parametros = {
     "num_aspersores": 20,
     "vazao_por_aspersor_max": 150.0,
     "pressao_bomba_max": 8.0,
-    "perda_pressao_por_metro": 0.003
+    "perda_pressao_por_metro": 0.003,
+    "prob_chuva": 0.01,
+    "tau_pressao": TAU_PRESSAO_PADRAO
 }
 
 estado_inicial = {
@@ -35,12 +50,16 @@ estado_inicial = {
     "ang_anterior": 0.0
 }
 
-def ler_sensor_umidade(umidade_real):
-    ruido = np.random.normal(0, 0.01)
+# As funções com ruído aceitam um numpy.random.Generator (rng); sem ele usam o estado global do np.random
+
+def ler_sensor_umidade(umidade_real, rng=None):
+    rng = np.random if rng is None else rng
+    ruido = rng.normal(0, 0.01)
     return max(0.0, min(1.0, umidade_real + ruido))
 
-def ler_sensor_pressao(pressao_real):
-    ruido = np.random.normal(0, 0.1)
+def ler_sensor_pressao(pressao_real, rng=None):
+    rng = np.random if rng is None else rng
+    ruido = rng.normal(0, 0.1)
     return max(0.0, pressao_real + ruido)
 
 def controle_crisp(umidade_sensor, capacidade):
@@ -51,22 +70,23 @@ def calcular_pressao_necessaria(fator_controle, pressao_bomba_max):
     return 3.0 + (pressao_bomba_max - 3.0) * fator_controle
 
 def calcular_pressao_aspersores(distancia_centro, pressao_atual, perda_pressao_por_metro):
+    """distancia_centro pode ser o array com a posição de todos os aspersores"""
     perda_pressao = perda_pressao_por_metro * distancia_centro
-    return max(2.0, pressao_atual - perda_pressao)
+    return np.maximum(2.0, pressao_atual - perda_pressao)
 
 def calcular_vazao_aspersor(pressao_local, fator_controle, posicao, vazao_por_aspersor_max, comprimento_braco):
-    if pressao_local < 2.0:
-        return 0.0
+    """Vazão de cada aspersor; pressao_local e posicao podem ser arrays"""
     vazao_base = vazao_por_aspersor_max * np.sqrt(pressao_local / 6.0)
     fator_posicao = 0.8 + 0.2 * (posicao / comprimento_braco)
-    return vazao_base * fator_controle * fator_posicao
+    return np.where(pressao_local < 2.0, 0.0, vazao_base * fator_controle * fator_posicao)
 
 def calcular_torque_resistivo(
-    setor_idx, vel_angular, resistencia_base, dias_completos=0, ang_atual=0.0, umidade=0.3
+    setor_idx, vel_angular, resistencia_base, dias_completos=0, ang_atual=0.0, umidade=0.3, rng=None
 ):
+    rng = np.random if rng is None else rng
     resistencia_solo = {0: 1.0, 1: 1.2, 2: 1.4, 3: 1.8}
     desgaste = 1.0 + 0.05 * dias_completos
-    variacao = 1.0 + np.random.normal(0, 0.05)
+    variacao = 1.0 + rng.normal(0, 0.05)
     solo_encharcado = 1.0 + 0.5 * (1 if umidade > 0.9 else 0)
     resistencia = (
         resistencia_base
@@ -78,7 +98,17 @@ def calcular_torque_resistivo(
     resistencia += 0.5 * abs(vel_angular)
     return resistencia
 
-def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
+@lru_cache(maxsize=None)
+def geometria_braco(comprimento_braco, num_aspersores):
+    """Posições dos aspersores e dos motores ao longo do braço; não mudam de um tick para o outro"""
+    posicoes_aspersores = np.linspace(10, comprimento_braco, num_aspersores)
+    posicoes_motores = np.linspace(0, comprimento_braco, NUM_MOTORES)
+    posicoes_aspersores.flags.writeable = False
+    posicoes_motores.flags.writeable = False
+    return posicoes_aspersores, posicoes_motores
+
+def atualizar_estado(estado, setores, parametros, rng=None):  # REMOVIDO 'obstaculos'
+    rng = np.random if rng is None else rng
     J = parametros["J"]
     torque_motor_max = parametros["torque_motor_max"]
     resistencia_base = parametros["resistencia_base"]
@@ -89,6 +119,8 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
     vazao_por_aspersor_max = parametros["vazao_por_aspersor_max"]
     pressao_bomba_max = parametros["pressao_bomba_max"]
     perda_pressao_por_metro = parametros["perda_pressao_por_metro"]
+    prob_chuva = parametros.get("prob_chuva", 0.01)
+    posicoes_aspersores, posicoes_motores = geometria_braco(comprimento_braco, num_aspersores)
     
     ang_atual = estado["ang_atual"]
     vel_angular = estado["vel_angular"]
@@ -116,7 +148,7 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
     declive_graus = get_declive(ang_atual, comprimento_braco)
     
     # CALCULAR VAZÃO INICIAL (necessária para o torque)
-    umidade_sensor = ler_sensor_umidade(setor_atual["umidade"])
+    umidade_sensor = ler_sensor_umidade(setor_atual["umidade"], rng)
     erro_umidade_atual = setor_atual['capacidade'] - umidade_sensor
     
     vento = 1.0 + 0.5 * np.sin(2 * np.pi * (horas_totais - 10) / 24)
@@ -136,7 +168,7 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
     # AGORA CALCULAR TORQUE E MOTORES
     declive_fator = 1.0 + abs(declive_graus) / 30.0
     resistencia_total = calcular_torque_resistivo(
-        setor_idx, vel_angular, resistencia_base, dias_completos, ang_atual, setor_atual["umidade"]
+        setor_idx, vel_angular, resistencia_base, dias_completos, ang_atual, setor_atual["umidade"], rng
     )
     resistencia_total *= declive_fator
     resistencia_total += 0.3 * (vazao_total_estimada / 100)
@@ -146,26 +178,17 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
     torque_motor = min(torque_motor_max, 200.0 * erro_vel + resistencia_total)
 
     # SISTEMA DE MOTORES COM FUZZY
-    NUM_MOTORES = 10
-    posicoes_motores = np.linspace(0, comprimento_braco, NUM_MOTORES)
-    estados_motores = []
-    for i, pos in enumerate(posicoes_motores):
-        declive_motor = get_declive(ang_atual, comprimento_braco=pos)
-        if i == NUM_MOTORES - 1:
-            ligado = True
-            ativacao_percentual = 100.0
-        else:
-            ativacao_percentual = get_controle_motor_fuzzy(abs(declive_motor), torque_motor, torque_motor_max)
-            ligado = ativacao_percentual > 50.0
+    estados_motores = np.zeros(NUM_MOTORES, dtype=dtype_motor)
+    estados_motores["pos"] = posicoes_motores
+    estados_motores["declive"] = get_declive(ang_atual, comprimento_braco=posicoes_motores)
+    # os motores das torres numa chamada só; o último (ponta do braço) fica sempre ligado
+    estados_motores["ativacao_fuzzy"][:-1] = get_controle_motor_fuzzy(
+        np.abs(estados_motores["declive"][:-1]), torque_motor, torque_motor_max)
+    estados_motores["ativacao_fuzzy"][-1] = 100.0
+    estados_motores["ligado"] = estados_motores["ativacao_fuzzy"] > 50.0
+    estados_motores["ligado"][-1] = True
 
-        estados_motores.append({
-            "pos": pos,
-            "declive": declive_motor,
-            "ligado": ligado,
-            "ativacao_fxuzzy": ativacao_percentual
-        })
-
-    motores_ativos = sum(m["ligado"] for m in estados_motores)
+    motores_ativos = int(estados_motores["ligado"].sum())
     
     ang_atual = (ang_atual + vel_angular * dt_real / 60) % 360
 
@@ -176,16 +199,16 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
     # Atualizar umidade do setor
     fator_temp = 1.0 + 0.03 * (temperatura_ambiente - 25.0)
     taxa_perda = setor_atual["perda"] * fator_temp * vento * radiacao
-    setor_atual["umidade"] -= taxa_perda * setor_atual["umidade"] * dt_real / 3600
+    # du/dt = -taxa_perda * u / 3600 integrada exatamente no passo, estável para qualquer dt_real
+    setor_atual["umidade"] *= np.exp(-taxa_perda * dt_real / 3600)
     
     # Chuva aleatória
-    chuva = np.random.binomial(1, 0.01)
+    chuva = rng.binomial(1, prob_chuva)
     if chuva:
-        for setor in setores:
-            setor["umidade"] = min(setor["capacidade"], setor["umidade"] + 0.01)
+        setores["umidade"] = np.minimum(setores["capacidade"], setores["umidade"] + 0.01)
 
     # Controle de irrigação
-    umidade_media = np.mean([s["umidade"] for s in setores])
+    umidade_media = setores["umidade"].mean()
     modo_emergencia = umidade_media < 0.20
 
     if modo_emergencia:
@@ -195,22 +218,16 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
         pressao_desejada = calcular_pressao_necessaria(fator_controle, pressao_bomba_max)
         
     erro_pressao = pressao_desejada - pressao_atual
-    pressao_atual += erro_pressao * 0.1
+    # atraso de primeira ordem com constante de tempo tau_pressao, exato para qualquer dt_real
+    pressao_atual += erro_pressao * (1.0 - np.exp(-dt_real / parametros.get("tau_pressao", TAU_PRESSAO_PADRAO)))
     pressao_atual = max(3.0, min(pressao_bomba_max, pressao_atual))
-    pressao_sensor = ler_sensor_pressao(pressao_atual)
+    pressao_sensor = ler_sensor_pressao(pressao_atual, rng)
 
     # Calcular vazões reais dos aspersores
-    posicoes_aspersores = np.linspace(10, comprimento_braco, num_aspersores)
-    vazao_total = 0.0
-    vazoes_aspersores = []
-    pressoes_aspersores = []
-
-    for pos in posicoes_aspersores:
-        pressao_local = calcular_pressao_aspersores(pos, pressao_atual, perda_pressao_por_metro)
-        vazao_asp = calcular_vazao_aspersor(pressao_local, fator_controle, pos, vazao_por_aspersor_max, comprimento_braco)
-        vazoes_aspersores.append(vazao_asp)
-        pressoes_aspersores.append(pressao_local)
-        vazao_total += vazao_asp
+    pressoes_aspersores = calcular_pressao_aspersores(posicoes_aspersores, pressao_atual, perda_pressao_por_metro)
+    vazoes_aspersores = calcular_vazao_aspersor(pressoes_aspersores, fator_controle, posicoes_aspersores,
+                                                vazao_por_aspersor_max, comprimento_braco)
+    vazao_total = float(vazoes_aspersores.sum())
 
     # Aplicar irrigação
     if vazao_total > 0:
@@ -221,7 +238,7 @@ def atualizar_estado(estado, setores, parametros):  # REMOVIDO 'obstaculos'
 
     # Recalcular física do motor com vazão real
     resistencia_total = calcular_torque_resistivo(
-        setor_idx, vel_angular, resistencia_base, dias_completos, ang_atual, setor_atual["umidade"]
+        setor_idx, vel_angular, resistencia_base, dias_completos, ang_atual, setor_atual["umidade"], rng
     )
     resistencia_total *= declive_fator
     resistencia_total += 0.3 * (vazao_total / 100)
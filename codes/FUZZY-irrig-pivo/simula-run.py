@@ -1,24 +1,120 @@
 from modelo import setores, parametros, estado_inicial, atualizar_estado
 from visual import criar_figura, atualizar_visual
+from telemetria import Telemetria
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+import numpy as np
+import threading
+import queue
 import copy
+import time
 import shutil
 import os
 
+# a simulação não fica presa à taxa de quadros: cada quadro desenhado avança passos_por_quadro passos do modelo
+passos_por_quadro = 10
+intervalo_quadro_ms = 100
+quadros_por_texto = 5       # o texto do painel só é remontado a cada quadros_por_texto quadros;
+                            # nos outros o painel é redesenhado com o texto anterior
+n_quadros = 3600
+blit = True
+
+# modo_thread: o modelo roda numa thread separada, o mais rápido que puder (ou até passos_por_segundo),
+# e deixa fotos do estado numa fila de tamanho_fila posições; a animação só desenha a mais recente.
+# Com a fila cheia a foto mais antiga é descartada, então a tela perde quadros em vez de segurar a simulação.
+modo_thread = True
+tamanho_fila = 4
+passos_por_segundo = None   # None = sem limite
+fator_aceleracao_tempo = None   # None mantém o valor de modelo.parametros
+semente = None
+diretorio_telemetria = None   # se definido, cada passo do modelo é gravado lá (ver telemetria.py)
+
+if fator_aceleracao_tempo is not None:
+    parametros["fator_aceleracao_tempo"] = fator_aceleracao_tempo
+
 fig, ax, elementos = criar_figura(setores)
 estado = copy.deepcopy(estado_inicial)
+setores_tela = setores
+fila_estados = queue.Queue(maxsize=tamanho_fila)
+parar = threading.Event()
+telemetria = None if diretorio_telemetria is None else Telemetria(diretorio_telemetria)
+contagem = {"passos": 0, "descartadas": 0, "quadros_sem_foto": 0}
+
+def tirar_foto(estado, setores):
+    """Cópia do que a tela lê: os setores mudam no lugar a cada passo, e setor_atual aponta para eles"""
+    setores_foto = setores.copy()
+    foto = dict(estado)
+    foto["setor_atual"] = setores_foto[estado["setor_idx"]]
+    return foto, setores_foto
+
+def produzir():
+    estado_sim = copy.deepcopy(estado_inicial)
+    rng = np.random.default_rng(semente)
+    inicio = time.perf_counter()
+    while not parar.is_set():
+        estado_sim = atualizar_estado(estado_sim, setores, parametros, rng=rng)
+        if telemetria is not None:
+            telemetria.registrar(estado_sim, setores)
+        contagem["passos"] += 1
+        foto = tirar_foto(estado_sim, setores)
+        try:
+            fila_estados.put_nowait(foto)
+        except queue.Full:
+            try:
+                fila_estados.get_nowait()
+                contagem["descartadas"] += 1
+            except queue.Empty:
+                pass
+            fila_estados.put_nowait(foto)
+        if passos_por_segundo is not None:
+            atraso = inicio + contagem["passos"] / passos_por_segundo - time.perf_counter()
+            if atraso > 0:
+                time.sleep(atraso)
 
 def frame_func(frame):
     global estado
-    estado = atualizar_estado(estado, setores, parametros)
-    return atualizar_visual(elementos, setores, estado, parametros)
+    for _ in range(passos_por_quadro):
+        estado = atualizar_estado(estado, setores, parametros)
+        if telemetria is not None:
+            telemetria.registrar(estado, setores)
+    return atualizar_visual(elementos, setores, estado, parametros,
+                            atualizar_texto=frame % quadros_por_texto == 0)
+
+def frame_func_thread(frame):
+    """Desenha a foto mais recente da fila; sem foto nova, redesenha a anterior"""
+    global estado, setores_tela
+    foto = None
+    while True:
+        try:
+            foto = fila_estados.get_nowait()
+        except queue.Empty:
+            break
+    if foto is None:
+        contagem["quadros_sem_foto"] += 1
+    else:
+        estado, setores_tela = foto
+    return atualizar_visual(elementos, setores_tela, estado, parametros,
+                            atualizar_texto=frame % quadros_por_texto == 0)
 
-ani = FuncAnimation(fig, frame_func, frames=3600, interval=100, blit=False)
-plt.tight_layout()
+if modo_thread:
+    produtor = threading.Thread(target=produzir, daemon=True)
+    produtor.start()
+    estado, setores_tela = fila_estados.get()
+    ani = FuncAnimation(fig, frame_func_thread, frames=n_quadros, interval=intervalo_quadro_ms, blit=blit)
+else:
+    ani = FuncAnimation(fig, frame_func, frames=n_quadros, interval=intervalo_quadro_ms, blit=blit)
 plt.show()
 
+if modo_thread:
+    parar.set()
+    produtor.join()
+    print(f"{contagem['passos']} passos simulados, {contagem['descartadas']} fotos descartadas, "
+          f"{contagem['quadros_sem_foto']} quadros sem foto nova")
+if telemetria is not None:
+    telemetria.fechar()
+    print(f"Telemetria: {telemetria.passos} passos em {diretorio_telemetria}")
+
 for root, dirs, files in os.walk('.', topdown=False):
     for name in dirs:
         if name == '__pycache__':
-            shutil.rmtree(os.path.join(root, name))
\ No newline at end of file
+            shutil.rmtree(os.path.join(root, name))
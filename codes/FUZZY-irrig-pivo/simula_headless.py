@@ -0,0 +1,91 @@
+from modelo import setores, parametros, estado_inicial, atualizar_estado
+import numpy as np
+import copy
+import time
+
+"""
+Roda o modelo sem animação, o mais rápido que der, e guarda cada estado num trace colunar
+(array estruturado NumPy, uma linha por passo e uma coluna por campo do estado).
+
+O simula-run.py fica preso no FuncAnimation (100 ms por quadro); aqui o tempo simulado é definido
+por dias_simulados (ou passos) e o resultado vai para arquivo_trace (.npy). A visualização é opcional:
+com plotar = True o trace é desenhado por visual.plotar_trace depois da simulação.
+"""
+
+dias_simulados = 1.0
+passos = None              # se definido, ignora dias_simulados
+semente = 0                # semente do numpy.random.Generator do modelo (None = diferente a cada execução)
+arquivo_trace = 'trace_fuzzy.npy'
+plotar = False
+
+
+def achatar_estado(estado, setores):
+    """Estado retornado por atualizar_estado -> dict só com números e arrays de números"""
+    linha = {}
+    for chave, valor in estado.items():
+        if isinstance(valor, np.void):
+            continue  # setor_atual, já está em setor_idx e umidades_setores
+        if chave == 'estados_motores':
+            for campo in valor.dtype.names:
+                linha[f'motores_{campo}'] = valor[campo]
+            continue
+        linha[chave] = valor
+    linha['umidades_setores'] = setores['umidade']
+    return linha
+
+
+def dtype_trace(linha):
+    """dtype do array estruturado a partir da primeira linha achatada"""
+    campos = []
+    for chave, valor in linha.items():
+        if np.ndim(valor) > 0:
+            tipo = '?' if np.asarray(valor).dtype == bool else 'f8'
+            campos.append((chave, tipo, (len(valor),)))
+        elif isinstance(valor, (bool, np.bool_)):
+            campos.append((chave, '?'))
+        elif isinstance(valor, (int, np.integer)):
+            campos.append((chave, 'i8'))
+        else:
+            campos.append((chave, 'f8'))
+    return np.dtype(campos)
+
+
+def simular(dias=None, n_passos=None, semente=None, verbose=True):
+    """
+    Avança o modelo n_passos (ou dias simulados) e retorna o trace (array estruturado com n_passos linhas).
+    Setores e estado inicial são copiados, então o módulo modelo não é alterado entre execuções.
+    O ruído vem de um Generator próprio (default_rng(semente)), não do estado global do np.random.
+    """
+    rng = np.random.default_rng(semente)
+    if n_passos is None:
+        dt_real = parametros['dt'] * parametros['fator_aceleracao_tempo']
+        n_passos = int(np.ceil(dias * 24 * 3600 / dt_real))
+
+    setores_sim = copy.deepcopy(setores)
+    estado = copy.deepcopy(estado_inicial)
+    trace = None
+
+    inicio = time.perf_counter()
+    for i in range(n_passos):
+        estado = atualizar_estado(estado, setores_sim, parametros, rng=rng)
+        linha = achatar_estado(estado, setores_sim)
+        if trace is None:
+            trace = np.zeros(n_passos, dtype=dtype_trace(linha))
+        trace[i] = tuple(linha[nome] for nome in trace.dtype.names)
+    duracao = time.perf_counter() - inicio
+
+    if verbose:
+        print(f"{n_passos} passos em {duracao:.2f} s ({n_passos / duracao:.0f} passos/s)")
+    return trace
+
+
+if __name__ == '__main__':
+    trace = simular(dias_simulados, passos, semente)
+    np.save(arquivo_trace, trace)
+    print(f"Trace salvo em {arquivo_trace}: {len(trace)} linhas, {len(trace.dtype.names)} colunas")
+
+    if plotar:
+        import matplotlib.pyplot as plt
+        from visual import plotar_trace
+        plotar_trace(trace)
+        plt.show()
@@ -0,0 +1,185 @@
+from simula_headless import achatar_estado, dtype_trace
+from modelo import setores, parametros, estado_inicial, atualizar_estado
+import numpy as np
+import threading
+import queue
+import json
+import copy
+import glob
+import os
+import time
+
+"""
+Telemetria de execuções longas: cada passo vira uma linha de um bloco pré-alocado (array estruturado com os mesmos
+campos do trace do simula_headless: escalares, umidades dos setores, vazões/pressões dos aspersores e motores).
+Bloco cheio vai para uma thread de escrita, que grava bloco_NNNNN.npz (comprimido) ou .npy (cru) no diretório,
+e a simulação segue no outro bloco. indice.json guarda o dtype e o tamanho de cada bloco.
+
+LeitorTelemetria lê só os blocos de um intervalo de passos: .npy com mmap_mode='r', .npz descomprimindo o bloco.
+Para análise de execuções de milhões de passos, para_memmap junta tudo num .npy só e devolve o memmap dele.
+"""
+
+passos_por_bloco = 100000
+comprimir = True
+diretorio_telemetria = 'telemetria_fuzzy'
+dias_simulados = 30.0
+semente = 0
+
+
+class Telemetria:
+    def __init__(self, diretorio, passos_por_bloco=passos_por_bloco, comprimir=comprimir, blocos_na_fila=2):
+        """
+        diretorio: onde vão os blocos e o indice.json (criado se não existir; blocos antigos são apagados).
+        blocos_na_fila: blocos cheios esperando escrita; com a fila cheia registrar espera o disco.
+        """
+        self.diretorio = diretorio
+        self.passos_por_bloco = passos_por_bloco
+        self.comprimir = comprimir
+        os.makedirs(diretorio, exist_ok=True)
+        for antigo in glob.glob(os.path.join(diretorio, 'bloco_*.np[yz]')):
+            os.remove(antigo)
+
+        self.dtype = None
+        self.bloco = None
+        self.linha = 0
+        self.blocos = []    # (nome do arquivo, linhas)
+        self.passos = 0
+
+        self.fila = queue.Queue(maxsize=blocos_na_fila)
+        self.erro = None
+        self.escritor = threading.Thread(target=self._escrever, daemon=True)
+        self.escritor.start()
+
+    def _escrever(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                return
+            caminho, bloco = item
+            try:
+                if self.comprimir:
+                    np.savez_compressed(caminho, trace=bloco)
+                else:
+                    np.save(caminho, bloco)
+            except Exception as e:
+                self.erro = e
+
+    def registrar(self, estado, setores):
+        """Copia um passo (estado retornado por atualizar_estado e os setores) para o bloco atual"""
+        linha = achatar_estado(estado, setores)
+        if self.bloco is None:
+            self.dtype = dtype_trace(linha)
+            self.bloco = np.empty(self.passos_por_bloco, dtype=self.dtype)
+        self.bloco[self.linha] = tuple(linha[nome] for nome in self.dtype.names)
+        self.linha += 1
+        self.passos += 1
+        if self.linha == self.passos_por_bloco:
+            self._despachar()
+
+    def _despachar(self):
+        if self.erro is not None:
+            raise self.erro
+        nome = f"bloco_{len(self.blocos):05d}" + ('.npz' if self.comprimir else '.npy')
+        self.fila.put((os.path.join(self.diretorio, nome), self.bloco[:self.linha]))
+        self.blocos.append((nome, self.linha))
+        self.bloco = np.empty(self.passos_por_bloco, dtype=self.dtype)
+        self.linha = 0
+
+    def fechar(self):
+        """Grava o bloco parcial, espera a thread de escrita e escreve o indice.json"""
+        if self.linha:
+            self._despachar()
+        self.fila.put(None)
+        self.escritor.join()
+        if self.erro is not None:
+            raise self.erro
+        indice = {'passos': self.passos,
+                  'dtype': None if self.dtype is None else np.lib.format.dtype_to_descr(self.dtype),
+                  'blocos': self.blocos}
+        with open(os.path.join(self.diretorio, 'indice.json'), 'w') as f:
+            json.dump(indice, f)
+
+
+class LeitorTelemetria:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, 'indice.json')) as f:
+            indice = json.load(f)
+        # JSON devolve listas; o descr do numpy quer (nome, tipo[, forma]) como tuplas
+        self.dtype = np.dtype([(c[0], c[1]) + ((tuple(c[2]),) if len(c) > 2 else ()) for c in indice['dtype']])
+        self.blocos = [nome for nome, _ in indice['blocos']]
+        self.inicios = np.concatenate(([0], np.cumsum([n for _, n in indice['blocos']])))
+        self._cache = (None, None)   # último bloco .npz descomprimido
+
+    def __len__(self):
+        return int(self.inicios[-1])
+
+    def bloco(self, i):
+        nome = self.blocos[i]
+        caminho = os.path.join(self.diretorio, nome)
+        if nome.endswith('.npy'):
+            return np.load(caminho, mmap_mode='r')
+        if self._cache[0] != i:
+            with np.load(caminho) as arquivo:
+                self._cache = (i, arquivo['trace'])
+        return self._cache[1]
+
+    def ler(self, inicio=0, fim=None, campos=None):
+        """Linhas [inicio, fim) do trace; campos limita às colunas pedidas (lista de nomes)"""
+        fim = len(self) if fim is None else min(fim, len(self))
+        partes = []
+        primeiro = np.searchsorted(self.inicios, inicio, side='right') - 1
+        for i in range(max(primeiro, 0), len(self.blocos)):
+            if self.inicios[i] >= fim:
+                break
+            bloco = self.bloco(i)
+            a = max(inicio - self.inicios[i], 0)
+            b = min(fim, self.inicios[i + 1]) - self.inicios[i]
+            trecho = bloco[a:b]
+            partes.append(trecho[campos] if campos is not None else trecho)
+        if not partes:
+            return np.empty(0, dtype=self.dtype if campos is None else self.dtype[campos])
+        return np.concatenate(partes)
+
+    def coluna(self, nome, inicio=0, fim=None):
+        return self.ler(inicio, fim, [nome])[nome]
+
+    def para_memmap(self, arquivo):
+        """Junta todos os blocos num .npy e devolve ele aberto com mmap_mode='r'"""
+        saida = np.lib.format.open_memmap(arquivo, mode='w+', dtype=self.dtype, shape=(len(self),))
+        for i in range(len(self.blocos)):
+            saida[self.inicios[i]:self.inicios[i + 1]] = self.bloco(i)
+        saida.flush()
+        del saida
+        return np.load(arquivo, mmap_mode='r')
+
+
+def gravar_simulacao(diretorio, dias, semente=None, **opcoes):
+    """Roda o modelo por `dias` simulados gravando cada passo na telemetria; retorna o número de passos"""
+    dt_real = parametros['dt'] * parametros['fator_aceleracao_tempo']
+    n_passos = int(np.ceil(dias * 24 * 3600 / dt_real))
+    rng = np.random.default_rng(semente)
+    setores_sim = copy.deepcopy(setores)
+    estado = copy.deepcopy(estado_inicial)
+
+    telemetria = Telemetria(diretorio, **opcoes)
+    try:
+        for _ in range(n_passos):
+            estado = atualizar_estado(estado, setores_sim, parametros, rng=rng)
+            telemetria.registrar(estado, setores_sim)
+    finally:
+        telemetria.fechar()
+    return n_passos
+
+
+if __name__ == '__main__':
+    inicio = time.perf_counter()
+    n_passos = gravar_simulacao(diretorio_telemetria, dias_simulados, semente)
+    duracao = time.perf_counter() - inicio
+    tamanho = sum(os.path.getsize(c) for c in glob.glob(os.path.join(diretorio_telemetria, 'bloco_*')))
+    print(f"{n_passos} passos em {duracao:.1f} s ({n_passos / duracao:.0f} passos/s), "
+          f"{tamanho / 1e6:.1f} MB em {diretorio_telemetria}")
+
+    leitor = LeitorTelemetria(diretorio_telemetria)
+    consumo = leitor.coluna('consumo_agua_total')
+    print(f"{len(leitor)} passos lidos de volta, consumo final {consumo[-1]:.0f} L")
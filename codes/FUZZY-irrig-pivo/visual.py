@@ -3,7 +3,16 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Wedge, Circle
 from modelo import ler_sensor_umidade
 
+setor_colors = ['lightblue', 'lightgreen', 'lightyellow', 'lightcoral']
+
+# gotas de água: só enfeite, então têm gerador próprio e não mexem no ruído do modelo
+rng_visual = np.random.default_rng()
+
 def criar_figura(setores):
+    """
+    Cria todos os artistas uma vez só; atualizar_visual só muda dados, cores e texto deles.
+    O painel de texto fica num eixo próprio (sem moldura) para poder entrar no blit do FuncAnimation.
+    """
     fig, ax = plt.subplots(figsize=(10, 7))
     plt.subplots_adjust(right=0.75)
     ax.set_xlim(-1.5, 2.0)
@@ -11,96 +20,61 @@ def criar_figura(setores):
     ax.set_aspect('equal')
     ax.set_title("Simulação do Pivô de Irrigação com Dinâmica Física - FUZZY")
    
-    setor_colors = ['lightblue', 'lightgreen', 'lightyellow', 'lightcoral']
     setor_labels = ['A', 'B', 'C', 'D']
     setor_wedges = []
+    # desenhados por cima dos setores: com blit os setores são redesenhados a cada quadro e cobririam estes
+    sobre_setores = []
     for i in range(4):
         wedge = Wedge((0,0), 1.2, i*90, (i+1)*90, facecolor=setor_colors[i], alpha=0.5, edgecolor='gray')
         ax.add_patch(wedge)
         setor_wedges.append(wedge)
         ang_label = np.deg2rad(i*90 + 45)
-        ax.text(0.8*np.cos(ang_label), 0.8*np.sin(ang_label), setor_labels[i], fontsize=14, weight='bold', ha='center', va='center')
+        sobre_setores.append(ax.text(0.8*np.cos(ang_label), 0.8*np.sin(ang_label), setor_labels[i],
+                                     fontsize=14, weight='bold', ha='center', va='center'))
 
     pivo_arm, = ax.plot([], [], 'b-', linewidth=4)
     aspersores, = ax.plot([], [], 'ko', markersize=6)
-    pivo_centro = Circle((0,0), 0.07, color='black')
+    pivo_centro = Circle((0,0), 0.07, color='black', zorder=2)
     ax.add_patch(pivo_centro)
+    sobre_setores.append(pivo_centro)
     water, = ax.plot([], [], 'co', markersize=2, alpha=0.7)
+    motores = ax.scatter([], [], s=36, alpha=0.8, zorder=3)
 
-    info_text = fig.text(
-        0.77, 0.97, '', fontsize=9, va='top', ha='left', family='monospace',
+    ax_info = fig.add_axes([0.76, 0.0, 0.24, 1.0])
+    ax_info.axis('off')
+    info_text = ax_info.text(
+        0.02, 0.97, '', fontsize=9, va='top', ha='left', family='monospace', transform=ax_info.transAxes,
         bbox=dict(facecolor='whitesmoke', edgecolor='gray', boxstyle='round,pad=0.5')
     )
 
     elementos = {
         "setor_wedges": setor_wedges,
+        "sobre_setores": sobre_setores,
         "pivo_arm": pivo_arm,
         "aspersores": aspersores,
         "water": water,
+        "motores": motores,
         "info_text": info_text,
         "ax": ax
     }
     return fig, ax, elementos
 
-def atualizar_visual(elementos, setores, estado, parametros):
-    setor_colors = ['lightblue', 'lightgreen', 'lightyellow', 'lightcoral']
-    pivo_arm = elementos["pivo_arm"]
-    aspersores = elementos["aspersores"]
-    water = elementos["water"]
-    info_text = elementos["info_text"]
-    setor_wedges = elementos["setor_wedges"]
-    ax = elementos["ax"]
-
-    comprimento_braco = parametros["comprimento_braco"]
-    ang_atual = estado["ang_atual"]
-    posicoes_aspersores = estado["posicoes_aspersores"]
+def gerar_gotas(x_aspersores, y_aspersores, vazoes_aspersores, rng=rng_visual):
+    """Nuvem de gotas em volta de cada aspersor com vazão > 5 L/min, num sorteio só para todas as gotas"""
+    ativos = vazoes_aspersores > 5.0
+    vazoes = vazoes_aspersores[ativos]
+    n_gotas = np.maximum(3, (vazoes / 15).astype(int))
+    raios = np.repeat(np.minimum(0.06, vazoes / 500), n_gotas)
+    sorteio = rng.random((2, raios.size))
+    angulos = 2*np.pi * sorteio[0]
+    distancias = raios * sorteio[1]
+    x_gotas = np.repeat(x_aspersores[ativos], n_gotas) + distancias * np.cos(angulos)
+    y_gotas = np.repeat(y_aspersores[ativos], n_gotas) + distancias * np.sin(angulos)
+    return x_gotas, y_gotas
+
+def texto_painel(estado, parametros):
     vazoes_aspersores = estado["vazoes_aspersores"]
-    ang_rad = np.deg2rad(ang_atual)
-    x_arm = [0, 1.2*np.cos(ang_rad)]
-    y_arm = [0, 1.2*np.sin(ang_rad)]
-    pivo_arm.set_data(x_arm, y_arm)
-
-    aspersores_norm = posicoes_aspersores / comprimento_braco * 1.2
-    x_aspersores = aspersores_norm * np.cos(ang_rad)
-    y_aspersores = aspersores_norm * np.sin(ang_rad)
-    aspersores.set_data(x_aspersores, y_aspersores)
-
-    vazao_total = estado["vazao_total"]
-    if vazao_total > 10:
-        x_water = []
-        y_water = []
-        for i, pos_norm in enumerate(aspersores_norm):
-            vazao_asp = vazoes_aspersores[i]
-            if vazao_asp > 5.0:
-                x_asp = pos_norm * np.cos(ang_rad)
-                y_asp = pos_norm * np.sin(ang_rad)
-                raio_aspersao = min(0.06, vazao_asp / 500)
-                n_drops = max(3, int(vazao_asp / 15))
-                for j in range(n_drops):
-                    angle_drop = np.random.uniform(0, 2*np.pi)
-                    radius_drop = np.random.uniform(0, raio_aspersao)
-                    x_drop = x_asp + radius_drop * np.cos(angle_drop)
-                    y_drop = y_asp + radius_drop * np.sin(angle_drop)
-                    x_water.append(x_drop)
-                    y_water.append(y_drop)
-        water.set_data(x_water, y_water)
-    else:
-        water.set_data([], [])
-
-    for i, setor in enumerate(setores):
-        if setor["umidade"] < setor["capacidade"] * 0.3:
-            cor = 'red'
-            alpha = 0.8
-        elif setor["umidade"] < setor["capacidade"] * 0.5:
-            cor = 'orange'
-            alpha = 0.6
-        else:
-            cor = setor_colors[i]
-            alpha = 0.5
-        setor_wedges[i].set_facecolor(cor)
-        setor_wedges[i].set_alpha(alpha)
-
-    aspersores_ativos = sum(1 for v in vazoes_aspersores if v > 5.0)
+    aspersores_ativos = int(np.count_nonzero(vazoes_aspersores > 5.0))
     pressao_min = min(estado["pressoes_aspersores"])
     pressao_max = max(estado["pressoes_aspersores"])
     vazao_l_s = estado["vazao_total"] / 60.0
@@ -138,27 +112,87 @@ def atualizar_visual(elementos, setores, estado, parametros):
         f"{'EMERGÊNCIA' if estado['modo_emergencia'] else 'NORMAL'}\n"
     )
 
-    # ADICIONAR SEÇÃO DOS MOTORES (igual ao CRISP)
     estados_motores = estado.get("estados_motores", [])
     info_motores = "\n═══ MOTORES FUZZY ═══\n"
     for i, m in enumerate(estados_motores):
         status = "ON " if m["ligado"] else "OFF"
-        ativacao = m.get('ativacao_fuzzy', 0.0)
+        ativacao = m['ativacao_fuzzy']
         info_motores += f"Motor {i+1:2d}: {status} | Declive: {m['declive']:+5.1f}° | Fuzzy: {ativacao:3.0f}%\n"
 
-    info_text.set_text(info_texto + info_motores)
+    return info_texto + info_motores
+
+def atualizar_visual(elementos, setores, estado, parametros, atualizar_texto=True):
+    """
+    Atualiza os artistas criados em criar_figura e retorna os que mudaram (para FuncAnimation com blit=True).
+    atualizar_texto=False mantém o texto do painel do quadro anterior: montar as ~45 linhas com texto_painel custa
+    mais que todo o resto do quadro. O painel é retornado sempre, porque com blit o FuncAnimation apaga no quadro
+    seguinte o fundo de tudo que foi retornado; redesenhar o mesmo texto sai barato (o layout fica em cache).
+    """
+    pivo_arm = elementos["pivo_arm"]
+    aspersores = elementos["aspersores"]
+    water = elementos["water"]
+    motores = elementos["motores"]
+    info_text = elementos["info_text"]
+    setor_wedges = elementos["setor_wedges"]
+
+    comprimento_braco = parametros["comprimento_braco"]
+    ang_atual = estado["ang_atual"]
+    posicoes_aspersores = estado["posicoes_aspersores"]
+    vazoes_aspersores = np.asarray(estado["vazoes_aspersores"])
+    ang_rad = np.deg2rad(ang_atual)
+    cos_ang, sin_ang = np.cos(ang_rad), np.sin(ang_rad)
+    pivo_arm.set_data([0, 1.2*cos_ang], [0, 1.2*sin_ang])
+
+    aspersores_norm = posicoes_aspersores / comprimento_braco * 1.2
+    x_aspersores = aspersores_norm * cos_ang
+    y_aspersores = aspersores_norm * sin_ang
+    aspersores.set_data(x_aspersores, y_aspersores)
 
-    # PLOTAR MOTORES NO BRAÇO (igual ao CRISP)
-    if hasattr(atualizar_visual, "motores_plot"):
-        for mp in atualizar_visual.motores_plot:
-            mp.remove()
-    atualizar_visual.motores_plot = []
-    for m in estados_motores:
-        cor = 'red' if m["ligado"] else 'gray'
-        x = (m["pos"] / comprimento_braco) * 1.2 * np.cos(ang_rad)
-        y = (m["pos"] / comprimento_braco) * 1.2 * np.sin(ang_rad)
-        mp = ax.plot(x, y, 'o', color=cor, markersize=6, alpha=0.8)[0]
-        atualizar_visual.motores_plot.append(mp)
+    if estado["vazao_total"] > 10:
+        water.set_data(*gerar_gotas(x_aspersores, y_aspersores, vazoes_aspersores))
+    else:
+        water.set_data([], [])
 
-    return pivo_arm, aspersores, water, info_text
+    for i, setor in enumerate(setores):
+        if setor["umidade"] < setor["capacidade"] * 0.3:
+            cor = 'red'
+            alpha = 0.8
+        elif setor["umidade"] < setor["capacidade"] * 0.5:
+            cor = 'orange'
+            alpha = 0.6
+        else:
+            cor = setor_colors[i]
+            alpha = 0.5
+        setor_wedges[i].set_facecolor(cor)
+        setor_wedges[i].set_alpha(alpha)
 
+    estados_motores = estado.get("estados_motores")
+    if estados_motores is not None and len(estados_motores):
+        motores_norm = estados_motores["pos"] / comprimento_braco * 1.2
+        motores.set_offsets(np.column_stack((motores_norm * cos_ang, motores_norm * sin_ang)))
+        motores.set_color(np.where(estados_motores["ligado"], 'red', 'gray'))
+
+    if atualizar_texto:
+        info_text.set_text(texto_painel(estado, parametros))
+    return (*setor_wedges, *elementos["sobre_setores"], pivo_arm, aspersores, water, motores, info_text)
+
+def plotar_trace(trace):
+    """Séries do trace gerado pelo simula_headless.py (uma linha por passo), em função do tempo simulado"""
+    horas = trace['tempo_simulacao_total'] / 60.0
+    fig, axs = plt.subplots(4, 1, figsize=(10, 9), sharex=True)
+    axs[0].plot(horas, trace['ang_atual'])
+    axs[0].set_ylabel('Posição (°)')
+    axs[1].plot(horas, trace['umidades_setores'])
+    axs[1].legend(['A', 'B', 'C', 'D'], loc='upper right')
+    axs[1].set_ylabel('Umidade')
+    axs[2].plot(horas, trace['vazao_total'])
+    axs[2].set_ylabel('Vazão (L/min)')
+    axs[3].plot(horas, trace['pressao_atual'], label='atual')
+    axs[3].plot(horas, trace['pressao_desejada'], '--', label='desejada')
+    axs[3].legend(loc='upper right')
+    axs[3].set_ylabel('Pressão (bar)')
+    axs[3].set_xlabel('Tempo simulado (h)')
+    for ax in axs:
+        ax.grid(True)
+    fig.tight_layout()
+    return fig, axs
@@ -0,0 +1,203 @@
+import numpy as np
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import scipy
+
+import pid_MA_PSO
+import pid_MF_PSO
+import pid_TF_PSO
+from pso import PSO
+from utils import (gerar_sinal_referencia, simular_sistema_malha_fechada, simular_sistema_malha_aberta,
+                   simular_sistema_funcao_transferencia)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'task2-Icaro', 'tutorial_p1'))
+with contextlib.redirect_stdout(io.StringIO()):  # o módulo imprime o cabeçalho da otimização ao ser importado
+    import plant_controller_goodhart as goodhart
+
+"""
+Benchmarks dos caminhos quentes da sintonia: sinais de referência, os três simuladores (1 ms, 5 s),
+uma avaliação de cada função objetivo, calculate_goodhart_metrics do task2 e um PSO pequeno completo.
+
+Cada caso roda `aquecimento` vezes sem medir e depois `repeticoes` vezes com time.perf_counter.
+O resultado vai para arquivo_baseline (JSON): mediana e mínimo do tempo, e um número que resume a saída do caso
+(soma da resposta, fitness, ...), para notar quando uma troca de motor de simulação muda o resultado e não só o tempo.
+
+Sem baseline (ou com salvar_baseline = True) a execução grava uma nova. Com baseline, compara cada caso:
+tempo mínimo mais de tolerancia_tempo acima do gravado é regressão (o mínimo oscila bem menos que a mediana
+numa máquina ocupada), resultado com diferença acima de tolerancia_resultado_abs + tolerancia_resultado * |baseline|
+é mudança de valor. Havendo qualquer uma das duas o script sai com código 1.
+A baseline vale para a máquina em que foi gravada; o bloco 'ambiente' do JSON diz qual foi.
+"""
+
+repeticoes = 5
+aquecimento = 1
+arquivo_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+salvar_baseline = False
+tolerancia_tempo = 0.25        # 25% mais lento que a baseline conta como regressão
+tolerancia_resultado = 1e-9    # diferença relativa no resumo da saída
+tolerancia_resultado_abs = 1e-9  # diferença absoluta, para resumos perto de zero
+filtro = None                  # só os casos cujo nome contém este texto
+
+tf_bench = 5.0
+ts_ms = 1
+dt = ts_ms / 1000.0
+ganhos = (10.0, 5.0, 1.0)               # kp, ki, kd dos simuladores e das funções objetivo
+ganhos_goodhart = (2.0, 1.0, 0.5)
+parametros_sinais = {
+    'degrau': {'amplitude': 1.0},
+    'senoidal': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+    'quadrada': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+    'dente_serra': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+    'aleatorio': {'amp_max': 1.0, 'amp_min': -1.0, 'periodo_max': 0.5, 'periodo_min': 0.1},
+}
+pso_pequeno = {'n_part': 10, 'max_iter': 5, 'semente': 0}
+
+
+def resumo_sinal(sinal, tempo):
+    """
+    Resumo de um sinal que muda com sinal, fase e amplitude: a soma simples de uma senoide ou quadrada
+    em períodos inteiros é zero e não nota nenhuma dessas trocas.
+    """
+    return float(np.sum(sinal * tempo) + np.sum(sinal**2))
+
+
+def montar_casos():
+    """Nome do caso -> função sem argumentos que roda o caso e devolve um float que resume a saída"""
+    casos = {}
+    tempo = np.linspace(0, tf_bench, int(tf_bench / dt) + 1)
+    kp, ki, kd = ganhos
+    senoidal = parametros_sinais['senoidal']
+
+    for tipo, parametros in parametros_sinais.items():
+        def caso(tipo=tipo, parametros=parametros):
+            return resumo_sinal(gerar_sinal_referencia(tipo, tempo, parametros, np.random.default_rng(0)), tempo)
+        casos[f'sinal_{tipo}'] = caso
+
+    def malha_fechada():
+        _, _, saida, _ = simular_sistema_malha_fechada(pid_MF_PSO.connected_systems_model, kp, ki, kd, 'senoidal',
+                                                       senoidal, pid_MF_PSO.a, pid_MF_PSO.k, ts_ms, tf_bench, dt,
+                                                       controlador=pid_MF_PSO.motor_controller)
+        return float(np.sum(saida))
+
+    def malha_aberta():
+        _, _, saida, _ = simular_sistema_malha_aberta(pid_MA_PSO.connected_systems_model, kp, ki, kd, 'senoidal',
+                                                      senoidal, pid_MA_PSO.a, pid_MA_PSO.k, ts_ms, tf_bench, dt,
+                                                      controlador=pid_MA_PSO.motor_controller)
+        return float(np.sum(saida))
+
+    def funcao_transferencia():
+        _, _, saida, _ = simular_sistema_funcao_transferencia(kp, ki, kd, 'senoidal', senoidal, ts_ms, tf_bench, dt)
+        return float(np.sum(saida))
+
+    casos['simular_malha_fechada'] = malha_fechada
+    casos['simular_malha_aberta'] = malha_aberta
+    casos['simular_funcao_transferencia'] = funcao_transferencia
+
+    casos['objetivo_MF'] = lambda: float(pid_MF_PSO.calcular_funcao_objetivo(kp, ki, kd))
+    casos['objetivo_MF_lote_30'] = lambda: float(np.sum(pid_MF_PSO.calcular_funcao_objetivo_lote(
+        np.tile(ganhos, (30, 1)))))
+    casos['objetivo_MA'] = lambda: float(pid_MA_PSO.calcular_funcao_objetivo(kp, ki, kd))
+    casos['objetivo_TF'] = lambda: float(pid_TF_PSO.calcular_funcao_objetivo(kp, ki, kd))
+
+    def metricas_goodhart():
+        metricas = goodhart.calculate_goodhart_metrics(list(ganhos_goodhart))
+        return float(sum(v for v in metricas.values() if np.isfinite(v)))
+
+    casos['goodhart_metricas'] = metricas_goodhart
+
+    def pso_mf():
+        pso = PSO(pid_MF_PSO.calcular_funcao_objetivo_lote, pid_MF_PSO.lim, pso_pequeno['n_part'],
+                  pso_pequeno['max_iter'], pid_MF_PSO.peso_inercia, pid_MF_PSO.peso_local, pid_MF_PSO.peso_global,
+                  lote=True, corte_antecipado=pid_MF_PSO.corte_antecipado,
+                  rng=np.random.default_rng(pso_pequeno['semente']), verbose=False)
+        _, gbest_fit = pso.otimizar()
+        return float(gbest_fit)
+
+    def pso_goodhart():
+        pso = goodhart.PSO(num_particles=pso_pequeno['n_part'], num_iterations=pso_pequeno['max_iter'],
+                           seed=pso_pequeno['semente'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, custo = pso.optimize()
+        return float(custo)
+
+    casos['pso_MF_lote'] = pso_mf
+    casos['pso_goodhart'] = pso_goodhart
+
+    if filtro is not None:
+        casos = {nome: caso for nome, caso in casos.items() if filtro in nome}
+    return casos
+
+
+def medir_caso(caso, repeticoes=repeticoes, aquecimento=aquecimento):
+    for _ in range(aquecimento):
+        caso()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = caso()
+        tempos.append(time.perf_counter() - inicio)
+    return {'mediana_s': float(np.median(tempos)), 'min_s': float(np.min(tempos)),
+            'repeticoes': repeticoes, 'resultado': resultado}
+
+
+def ambiente():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'maquina': platform.machine(), 'processador': platform.processor(), 'sistema': platform.platform(),
+            'data': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def comparar(medidas, baseline):
+    """Imprime a comparação com a baseline e devolve a lista de problemas (regressão de tempo ou resultado)"""
+    problemas = []
+    casos_base = baseline['casos']
+    print(f"Baseline de {baseline['ambiente']['data']} (numpy {baseline['ambiente']['numpy']}, "
+          f"{baseline['ambiente']['maquina']})")
+    print(f"{'caso':32s} {'base (ms)':>10s} {'agora (ms)':>10s} {'razão':>7s}")
+    for nome, medida in medidas.items():
+        if nome not in casos_base:
+            print(f"{nome:32s} {'-':>10s} {medida['min_s'] * 1e3:10.2f}    novo")
+            continue
+        base = casos_base[nome]
+        razao = medida['min_s'] / base['min_s']
+        marca = ''
+        if razao > 1 + tolerancia_tempo:
+            marca = '  REGRESSÃO'
+            problemas.append(f"{nome}: {razao:.2f}x mais lento")
+        diferenca = abs(medida['resultado'] - base['resultado'])
+        if not (diferenca <= tolerancia_resultado_abs + tolerancia_resultado * abs(base['resultado'])
+                or medida['resultado'] == base['resultado']):
+            marca += f"  resultado mudou ({base['resultado']:.10g} -> {medida['resultado']:.10g})"
+            problemas.append(f"{nome}: resultado mudou {diferenca:.2e}")
+        print(f"{nome:32s} {base['min_s'] * 1e3:10.2f} {medida['min_s'] * 1e3:10.2f} {razao:7.2f}{marca}")
+    return problemas
+
+
+def rodar():
+    medidas = {}
+    for nome, caso in montar_casos().items():
+        medidas[nome] = medir_caso(caso)
+        print(f"{nome:32s} {medidas[nome]['mediana_s'] * 1e3:10.2f} ms (mín {medidas[nome]['min_s'] * 1e3:.2f} ms)")
+    return medidas
+
+
+if __name__ == '__main__':
+    medidas = rodar()
+    print()
+
+    if salvar_baseline or not os.path.exists(arquivo_baseline):
+        with open(arquivo_baseline, 'w') as f:
+            json.dump({'ambiente': ambiente(), 'casos': medidas}, f, indent=2)
+        print(f"Baseline gravada em {arquivo_baseline}")
+    else:
+        with open(arquivo_baseline) as f:
+            baseline = json.load(f)
+        problemas = comparar(medidas, baseline)
+        if problemas:
+            print("\n" + "\n".join(problemas))
+            sys.exit(1)
+        print("\nSem regressões")
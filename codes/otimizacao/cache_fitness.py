@@ -0,0 +1,155 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+
+"""
+Cache de fitness para o PSO.
+
+Partícula presa no limite de lim, reinicialização por diversidade e re-sorteio acabam avaliando de novo
+quase o mesmo (kp, ki, kd), e cada avaliação é uma simulação inteira. Aqui os ganhos são quantizados
+(resolucao) e a chave é (hash da configuração, kp, ki, kd) quantizados. A configuração é tudo que muda
+o valor do fitness: tf, ts_ms, referência, parâmetros da planta... se mudar qualquer coisa o hash muda
+e as entradas antigas deixam de valer.
+
+A função é sempre avaliada no ponto quantizado, então o valor guardado é exatamente o da chave.
+
+Memória: LRU com no máximo `capacidade` entradas (OrderedDict).
+Disco (opcional): arquivo SQLite, para reaproveitar avaliações entre execuções na mesma planta.
+"""
+
+def hash_configuracao(config):
+    """sha1 da configuração do objetivo (dict com valores serializáveis em JSON)"""
+    texto = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+class CacheFitness:
+    def __init__(self, funcao_objetivo_lote, config, resolucao=1e-4, capacidade=100000, arquivo=None):
+        """
+        funcao_objetivo_lote: recebe ganhos (N, 3) e devolve fitness (N,).
+        config: dict com a configuração do objetivo, entra no hash da chave.
+        resolucao: passo de quantização dos ganhos.
+        capacidade: máximo de entradas em memória (LRU).
+        arquivo: caminho do SQLite; None deixa o cache só em memória.
+        """
+        self.funcao_objetivo_lote = funcao_objetivo_lote
+        self.config_hash = hash_configuracao(config)
+        self.resolucao = resolucao
+        self.capacidade = capacidade
+
+        self.memoria = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.acertos_disco = 0
+
+        self.conexao = None
+        if arquivo is not None:
+            self.conexao = sqlite3.connect(arquivo)
+            self.conexao.execute('CREATE TABLE IF NOT EXISTS fitness ('
+                                 'config TEXT, kp INTEGER, ki INTEGER, kd INTEGER, valor REAL, '
+                                 'PRIMARY KEY (config, kp, ki, kd))')
+            self.conexao.commit()
+
+    def quantizar(self, ganhos):
+        return np.round(np.atleast_2d(np.asarray(ganhos, dtype=float)) / self.resolucao).astype(np.int64)
+
+    def _buscar_memoria(self, chave):
+        valor = self.memoria.get(chave)
+        if valor is not None:
+            self.memoria.move_to_end(chave)
+        return valor
+
+    def _guardar_memoria(self, chave, valor):
+        self.memoria[chave] = valor
+        self.memoria.move_to_end(chave)
+        while len(self.memoria) > self.capacidade:
+            self.memoria.popitem(last=False)
+
+    def _buscar_disco(self, chave):
+        if self.conexao is None:
+            return None
+        linha = self.conexao.execute('SELECT valor FROM fitness WHERE config=? AND kp=? AND ki=? AND kd=?',
+                                     (self.config_hash,) + chave).fetchone()
+        return None if linha is None else linha[0]
+
+    def _guardar_disco(self, chaves, valores):
+        if self.conexao is None or not chaves:
+            return
+        self.conexao.executemany('INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?)',
+                                 [(self.config_hash,) + c + (v,) for c, v in zip(chaves, valores)])
+        self.conexao.commit()
+
+    def __call__(self, ganhos, limites=None, estatisticas=None):
+        """
+        Mesmo contrato de funcao_objetivo_lote: (N, 3) -> (N,). Só as chaves novas são simuladas, num lote só.
+        Com limites, repassa o corte antecipado e retorna (fits, abortadas); valor de avaliação abortada é só
+        um limite inferior, então não vai para o cache.
+        """
+        q = self.quantizar(ganhos)
+        fits = np.empty(len(q))
+        abortadas = np.zeros(len(q), dtype=bool)
+        pendentes = {}  # chave -> índices das partículas com essa chave
+
+        for i, linha in enumerate(q):
+            chave = tuple(int(v) for v in linha)
+            valor = self._buscar_memoria(chave)
+            if valor is None:
+                valor = self._buscar_disco(chave)
+                if valor is not None:
+                    self.acertos_disco += 1
+                    self._guardar_memoria(chave, valor)
+            if valor is not None:
+                self.acertos += 1
+                fits[i] = valor
+            elif chave in pendentes:
+                # repetida dentro do mesmo lote: simula uma vez só
+                self.acertos += 1
+                pendentes[chave].append(i)
+            else:
+                self.falhas += 1
+                pendentes[chave] = [i]
+
+        if pendentes:
+            chaves = list(pendentes)
+            pontos = np.array(chaves, dtype=float) * self.resolucao
+            if limites is None:
+                valores = np.asarray(self.funcao_objetivo_lote(pontos), dtype=float)
+                cortadas = np.zeros(len(chaves), dtype=bool)
+            else:
+                # chave repetida no lote: só aborta se passou do maior limite entre as partículas dela
+                limites = np.broadcast_to(np.asarray(limites, dtype=float), (len(q),))
+                limites_chaves = np.array([limites[pendentes[c]].max() for c in chaves])
+                valores, cortadas = self.funcao_objetivo_lote(pontos, limites=limites_chaves, estatisticas=estatisticas)
+                valores = np.asarray(valores, dtype=float)
+            completas = []
+            for chave, valor, cortada in zip(chaves, valores, cortadas):
+                fits[pendentes[chave]] = valor
+                abortadas[pendentes[chave]] = cortada
+                if not cortada:
+                    self._guardar_memoria(chave, float(valor))
+                    completas.append((chave, float(valor)))
+            self._guardar_disco([c for c, _ in completas], [v for _, v in completas])
+
+        if limites is None:
+            return fits
+        return fits, abortadas
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {'acertos': self.acertos,
+                'falhas': self.falhas,
+                'acertos_disco': self.acertos_disco,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'entradas_memoria': len(self.memoria)}
+
+    def imprimir_estatisticas(self):
+        e = self.estatisticas()
+        print(f"Cache de fitness: {e['acertos']} acertos ({e['acertos_disco']} do disco), {e['falhas']} falhas, "
+              f"taxa de acerto {100*e['taxa_acerto']:.1f}%, {e['entradas_memoria']} entradas em memória")
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
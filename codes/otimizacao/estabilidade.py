@@ -0,0 +1,149 @@
+import numpy as np
+from functools import lru_cache
+from scipy import signal
+
+from utils import obter_planta_tf
+
+"""
+Pré-triagem de estabilidade para o PSO.
+
+As malhas fechadas dos tuners são lineares fora da saturação e de ordem baixa, então dá para saber antes de simular
+se um (kp, ki, kd) é instável: monta o polinômio característico discreto de cada partícula, pega as raízes como
+autovalores das matrizes companheiras (um np.linalg.eigvals só para o enxame inteiro) e olha o maior módulo.
+Partícula com raio espectral >= 1 não é simulada e recebe custo_instavel + peso_margem * (raio - 1), que cresce
+com a distância até a estabilidade, então o enxame continua sendo puxado para a região estável.
+
+polinomio_mf: malha do pid_MF_PSO (motor_model com a, k e o erro de modelo, PID amostrado).
+polinomio_tf: malha do pid_TF_PSO (planta num/den discretizada com ZOH, PID com o erro da amostra anterior).
+A malha aberta do pid_MA_PSO não tem realimentação: o polo é k*a_model_error para qualquer ganho, não há o que triar.
+"""
+
+
+def raio_espectral(coeficientes, raiz_ignorada=None):
+    """
+    Maior módulo das raízes de cada linha de coeficientes (N, grau+1), potência mais alta primeiro.
+    raiz_ignorada: (N,) bool; nessas linhas a raiz mais próxima de z = 1 é descartada (fator (z - 1) que cancela).
+    Linha com coeficiente não finito dá raio infinito.
+    """
+    c = np.atleast_2d(np.asarray(coeficientes, dtype=float))
+    raio = np.full(len(c), np.inf)
+    validas = np.all(np.isfinite(c), axis=1) & (c[:, 0] != 0)
+    c = c[validas] / c[validas, :1]
+    grau = c.shape[1] - 1
+
+    companheira = np.zeros((len(c), grau, grau))
+    companheira[:, 0, :] = -c[:, 1:]
+    companheira[:, np.arange(1, grau), np.arange(grau - 1)] = 1.0
+    raizes = np.linalg.eigvals(companheira) if len(c) else np.zeros((0, grau))
+    modulos = np.abs(raizes)
+
+    if raiz_ignorada is not None:
+        ignorar = np.asarray(raiz_ignorada, dtype=bool)[validas]
+        perto_de_um = np.argmin(np.abs(raizes - 1.0), axis=1)
+        modulos[ignorar, perto_de_um[ignorar]] = 0.0
+
+    raio[validas] = np.max(modulos, axis=1)
+    return raio
+
+
+def polinomio_mf(ganhos, a, k, a_model_error, k_model_error, ts_ms, dt):
+    """
+    z^2 + c1 z + c0 da malha de calcular_funcao_objetivo_lote (pid_MF_PSO) fora da saturação.
+
+    No passo o motor é dx = alfa*x + beta, alfa = k*a_model_error - g*kp, g = k/(k + k_model_error), e beta carrega
+    os termos amostrados ki*ts_ms*(e[i] + e[i-1])*dt e kd*(e[i] - e[i-1])/(dt*ts_ms). Com r = 0 e e = -x:
+    x[i+1] = phi*x[i] - gama*((g1 + g2)*x[i] + (g1 - g2)*x[i-1]), phi = e^(alfa*dt), gama = g*(phi - 1)/alfa,
+    g1 = ki*ts_ms*dt e g2 = kd/(dt*ts_ms).
+    """
+    ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+    kp, ki, kd = ganhos[:, 0], ganhos[:, 1], ganhos[:, 2]
+    ganho_tensao = k / (k + k_model_error)
+    alfa = k * a_model_error - ganho_tensao * kp
+    phi = np.exp(alfa * dt)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gama = ganho_tensao * np.where(alfa != 0, np.expm1(alfa * dt) / alfa, dt)
+    g1 = ki * ts_ms * dt
+    g2 = kd / (dt * ts_ms)
+    return np.stack([np.ones_like(kp), -(phi - gama * (g1 + g2)), gama * (g1 - g2)], axis=1)
+
+
+@lru_cache(maxsize=None)
+def _tf_discreta(num, den, dt):
+    """num_d, den_d (mesmo comprimento) da PlantaTF de (num, den, dt)"""
+    planta = obter_planta_tf(num, den, dt)
+    num_d, den_d = signal.ss2tf(planta.Ad, planta.Bd, planta.Cd, planta.Dd)
+    return num_d[0], den_d
+
+
+def polinomio_tf(ganhos, num, den, dt):
+    """
+    Polinômio característico da malha de simular_funcao_transferencia_lote: o PID usa o erro da amostra anterior,
+    então a malha é G(z)*C(z) com C(z) = kp + ki*dt*z/(z - 1) + (kd/dt)*(z - 1)/z, e
+    den_d*z*(z - 1) + num_d*(kp*z*(z - 1) + ki*dt*z^2 + (kd/dt)*(z - 1)^2) = 0.
+    Com ki = 0 o fator (z - 1) é comum aos dois termos e não é polo de verdade (ver raio_espectral).
+    """
+    ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+    kp, ki, kd = ganhos[:, 0], ganhos[:, 1], ganhos[:, 2]
+    num_d, den_d = _tf_discreta(tuple(num), tuple(den), dt)
+
+    pid = np.stack([kp + ki * dt + kd / dt, -kp - 2 * kd / dt, kd / dt], axis=1)
+    coeficientes = np.tile(np.convolve(den_d, [1.0, -1.0, 0.0]), (len(ganhos), 1))
+    for i, c in enumerate(num_d):
+        coeficientes[:, i:i + 3] += c * pid
+    return coeficientes
+
+
+class TriagemEstabilidade:
+    def __init__(self, funcao_objetivo_lote, polinomio, custo_instavel=10.0, peso_margem=10.0,
+                 integrador_cancela=False):
+        """
+        funcao_objetivo_lote: (N, 3) -> (N,), com o mesmo contrato de corte antecipado do PSO (limites, estatisticas).
+        polinomio: ganhos (N, 3) -> coeficientes (N, grau+1) do polinômio característico discreto.
+        custo_instavel / peso_margem: custo de quem não é simulado, custo_instavel + peso_margem * (raio - 1).
+        integrador_cancela: o polinômio tem o fator (z - 1) do integrador, que cancela quando ki = 0.
+        """
+        self.funcao_objetivo_lote = funcao_objetivo_lote
+        self.polinomio = polinomio
+        self.custo_instavel = custo_instavel
+        self.peso_margem = peso_margem
+        self.integrador_cancela = integrador_cancela
+        self.avaliacoes = 0
+        self.evitadas = 0
+
+    def raio(self, ganhos):
+        ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+        ignorar = ganhos[:, 1] == 0 if self.integrador_cancela else None
+        return raio_espectral(self.polinomio(ganhos), ignorar)
+
+    def __call__(self, ganhos, limites=None, estatisticas=None):
+        """Mesmo contrato da função objetivo; só as partículas estáveis chegam a ela, num lote só"""
+        ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+        raio = self.raio(ganhos)
+        instavel = ~(raio < 1.0)
+        estavel = ~instavel
+
+        fits = np.empty(len(ganhos))
+        abortadas = np.zeros(len(ganhos), dtype=bool)
+        fits[instavel] = self.custo_instavel + self.peso_margem * np.minimum(raio[instavel] - 1.0, 1e12)
+        self.avaliacoes += len(ganhos)
+        self.evitadas += int(instavel.sum())
+
+        if estavel.any():
+            if limites is None:
+                fits[estavel] = self.funcao_objetivo_lote(ganhos[estavel])
+            else:
+                limites = np.broadcast_to(np.asarray(limites, dtype=float), (len(ganhos),))
+                valores, cortadas = self.funcao_objetivo_lote(ganhos[estavel], limites=limites[estavel],
+                                                              estatisticas=estatisticas)
+                fits[estavel] = valores
+                abortadas[estavel] = cortadas
+
+        if limites is None:
+            return fits
+        return fits, abortadas
+
+    def imprimir_estatisticas(self):
+        if not self.avaliacoes:
+            return
+        print(f"Pré-triagem de estabilidade: {self.evitadas} de {self.avaliacoes} simulações evitadas "
+              f"({100 * self.evitadas / self.avaliacoes:.1f}%)")
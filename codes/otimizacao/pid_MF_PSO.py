@@ -1,7 +1,10 @@
 import numpy as np
 from scipy.integrate import odeint
-import random
-from utils import simular_sistema_malha_fechada, visualizar_resultados
+from functools import lru_cache, partial
+from cache_fitness import CacheFitness
+from estabilidade import TriagemEstabilidade, polinomio_mf
+from pso import PSO
+from utils import gerar_sinal_referencia, simular_sistema_malha_fechada, visualizar_resultados
 
 
 """
@@ -27,7 +30,36 @@ lim = [(1.0, 50.0),      # kp: ganho proporcional
 peso_inercia = 0.9
 peso_local = 1.2
 peso_global = 1.2
-veloc_max = [(b[1]-b[0])*0.2 for b in lim]
+
+# Semente do PSO e do sinal aleatório de validação (None = diferente a cada execução).
+# Cada um recebe o seu fluxo, filho de SeedSequence(semente).
+semente = None
+
+# cache de fitness: None deixa só em memória, um caminho .sqlite reaproveita avaliações entre execuções
+arquivo_cache = None
+resolucao_cache = 1e-4
+
+# para de simular a partícula cujo custo parcial já passou do próprio pbest
+corte_antecipado = True
+intervalo_corte = 25
+
+# descarta sem simular os ganhos com malha fechada instável (raio espectral do polinômio característico >= 1)
+pre_triagem_estabilidade = True
+custo_instavel = 10.0
+
+# fitness robusta: cada partícula é avaliada nos cinco sinais de gerar_sinal_referencia e em n_aleatorios realizações
+# do 'aleatorio' (sementes fixas, as mesmas em toda avaliação), numa simulação só de (partículas x referências).
+# agregacao_robusta: 'media', 'pior' (pior referência) ou 'cvar' (média da fração alfa_cvar de referências piores)
+fitness_robusta = False
+agregacao_robusta = 'cvar'
+alfa_cvar = 0.25
+n_aleatorios = 3
+semente_referencias = 0
+sinais_robustos = {'degrau': {'amplitude': 1.0},
+                   'senoidal': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+                   'quadrada': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+                   'dente_serra': {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0},
+                   'aleatorio': {'amp_max': 1.0, 'amp_min': -1.0, 'periodo_max': 0.5, 'periodo_min': 0.1}}
 
 def motor_model(x1_m, u, a, k):
     dx1_m = -a*k*x1_m + k*u
@@ -125,106 +157,281 @@ def calcular_funcao_objetivo(kp, ki, kd):
 
     return j + balance_penalty + effort_penalty
 
-"""
-Daqui por diante é o PSO (Particle Swarm Optimization), gera, testa e atualiza as combinações.
-
-particles: cada uma é um conjunto de valores (k_p, k_i, k_d) que o algoritmo vai testar
-velocity: como cada partícula se move pelo espaço de busca
-pbest: melhor resultado que cada partícula já achou
-gbest: melhor resultado geral de todas as partículas
- 
-A ideia é: cada partícula vai testando valores diferentes e se move em direção
-ao que ela achou de melhor (pbest) e ao que o grupo todo achou de melhor (gbest)
-"""
-particles = []
-velocity = []
-pbest = []
-pbest_fit = []
-
-for i in range(n_part):
-    p = [random.uniform(lim[j][0],lim[j][1]) for j in range(3)]
-    particles.append(p)
-    velocity.append([random.uniform(-veloc_max[j],veloc_max[j]) for j in range(3)])
-    pbest.append(p[:])
-    pbest_fit.append(calcular_funcao_objetivo(*p))
-
-gbest = pbest[0][:]
-gbest_fit = pbest_fit[0]
-for i in range(1,n_part):
-    if pbest_fit[i] < gbest_fit:
-        gbest_fit = pbest_fit[i]
-        gbest = pbest[i][:]
-
-print("Busca Inicial:", gbest, gbest_fit)
-
-for it in range(max_iter):
-    for i in range(n_part):
-        f = calcular_funcao_objetivo(*particles[i])
-        if f < pbest_fit[i]:
-            pbest_fit[i] = f
-            pbest[i] = particles[i][:]
-            if f < gbest_fit:
-                gbest_fit = f
-                gbest = particles[i][:]
-                print(f"Nova melhor solução na iter {it}: kp={gbest[0]:.3f}, ki={gbest[1]:.3f}, kd={gbest[2]:.3f} | fit={gbest_fit:.10f}")
-
-    for i in range(n_part):
-        for d in range(3):
-            r1 = random.random()
-            r2 = random.random()
-            velocity[i][d] = (peso_inercia*velocity[i][d] +
-                         peso_local*r1*(pbest[i][d]-particles[i][d]) +
-                         peso_global*r2*(gbest[d]-particles[i][d]))
-            velocity[i][d] = max(-veloc_max[d], min(veloc_max[d], velocity[i][d]))
-            particles[i][d] += velocity[i][d]
-            particles[i][d] = max(lim[d][0], min(lim[d][1], particles[i][d]))
-
-            if random.random() < 0.15:
-                particles[i][d] = random.uniform(lim[d][0], lim[d][1])
-
-    if it % 3 == 0:
-        diversity = 0
-        for d in range(3):
-            values = [particles[i][d] for i in range(n_part)]
-            diversity += np.std(values)
-
-        if diversity < 5.0:
-            print(f"Baixa diversidade na iter {it}, reinicializando...")
-            for i in range(n_part//2):
-                particles[i] = [random.uniform(lim[j][0],lim[j][1]) for j in range(3)]
-                velocity[i] = [random.uniform(-veloc_max[j],veloc_max[j]) for j in range(3)]
-
-print("Final:", gbest, gbest_fit)
-print(f"Parâmetros do controlador PID: kp={gbest[0]:.3f}, ki={gbest[1]:.3f}, kd={gbest[2]:.3f}")
-
-tf_simulacao = 5.0
-
-# Sinal degrau
-parametros_degrau = {'amplitude': 1.0}
-tempo, ref, saida, controle = simular_sistema_malha_fechada(
-    connected_systems_model, gbest[0], gbest[1], gbest[2], 'degrau', parametros_degrau, a, k, ts_ms, tf_simulacao, dt)
-visualizar_resultados(tempo, ref, saida, controle, 'Degrau', save_dir)
-
-# Sinal senoidal
-parametros_senoidal = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
-tempo, ref, saida, controle = simular_sistema_malha_fechada(
-    connected_systems_model, gbest[0], gbest[1], gbest[2], 'senoidal', parametros_senoidal, a, k, ts_ms, tf_simulacao, dt)
-visualizar_resultados(tempo, ref, saida, controle, 'Senoidal', save_dir)
-
-# Sinal onda quadrada
-parametros_quadrada = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
-tempo, ref, saida, controle = simular_sistema_malha_fechada(
-    connected_systems_model, gbest[0], gbest[1], gbest[2], 'quadrada', parametros_quadrada, a, k, ts_ms, tf_simulacao, dt)
-visualizar_resultados(tempo, ref, saida, controle, 'Quadrada', save_dir)
-
-# Sinal dente de serra
-parametros_dente_serra = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
-tempo, ref, saida, controle = simular_sistema_malha_fechada(
-    connected_systems_model, gbest[0], gbest[1], gbest[2], 'dente_serra', parametros_dente_serra, a, k, ts_ms, tf_simulacao, dt)
-visualizar_resultados(tempo, ref, saida, controle, 'Dente de Serra', save_dir)
-
-# Sinal aleatório
-parametros_aleatorio = {'amp_max': 1.0, 'amp_min': -1.0, 'periodo_max': 0.5, 'periodo_min': 0.1}
-tempo, ref, saida, controle = simular_sistema_malha_fechada(
-    connected_systems_model, gbest[0], gbest[1], gbest[2], 'aleatorio', parametros_aleatorio, a, k, ts_ms, tf_simulacao, dt)
-visualizar_resultados(tempo, ref, saida, controle, 'Aleatório', save_dir)
\ No newline at end of file
+def _coeficientes_regime(tau, regime, v, kp, ganho_tensao, alfa_livre, alfa_sat):
+    """dx = alfa*x + beta do motor em malha fechada; regime 0 é a faixa linear e +-1 a saturação em +-12 V"""
+    alfa = np.where(regime != 0, alfa_sat, alfa_livre)
+    beta = np.where(regime != 0, ganho_tensao * regime * 12.0, ganho_tensao * (v + kp * tau))
+    return alfa, beta
+
+def _avancar_regime(tau, h, regime, v, kp, ganho_tensao, alfa_livre, alfa_sat):
+    """Solução exata de dx = alfa*x + beta por um intervalo h"""
+    alfa, beta = _coeficientes_regime(tau, regime, v, kp, ganho_tensao, alfa_livre, alfa_sat)
+    ah = alfa * h
+    fator = np.where(np.abs(ah) > 1e-12, np.expm1(ah) / np.where(alfa == 0, 1.0, alfa), h)
+    return tau + fator * (alfa * tau + beta)
+
+def calcular_funcao_objetivo_lote(ganhos, limites=None, estatisticas=None):
+    """
+    Mesma função objetivo de calcular_funcao_objetivo (referência sin(t)), avaliando o enxame inteiro de uma vez.
+    ganhos: array (N, 3) com as colunas kp, ki, kd. Retorna um array (N,) com o fitness de cada partícula.
+    """
+    n = int((1 / (ts_ms / 1000.0)) * tf + 1)
+    torque_ref = np.sin(np.linspace(0, tf, n))
+    return simular_custos_referencias(ganhos, torque_ref[np.newaxis, :], 'media', limites, estatisticas)
+
+def calcular_funcao_objetivo_robusta(ganhos, limites=None, estatisticas=None):
+    """
+    Fitness robusta: o custo de calcular_funcao_objetivo em cada sinal de referencias_robustas(),
+    juntado por agregacao_robusta. Mesmo contrato de calcular_funcao_objetivo_lote.
+    """
+    return simular_custos_referencias(ganhos, referencias_robustas(), agregacao_robusta, limites, estatisticas)
+
+def referencias_robustas():
+    """(R, n): um sinal de referência por linha, na mesma grade de tempo da função objetivo"""
+    return _referencias_robustas(tf, ts_ms, n_aleatorios, semente_referencias,
+                                 tuple((tipo, tuple(sorted(p.items()))) for tipo, p in sinais_robustos.items()))
+
+@lru_cache(maxsize=None)
+def _referencias_robustas(tf, ts_ms, n_aleatorios, semente_referencias, sinais):
+    n = int((1 / (ts_ms / 1000.0)) * tf + 1)
+    time_vector = np.linspace(0, tf, n)
+    referencias = []
+    for tipo, parametros in sinais:
+        if tipo == 'aleatorio':
+            for semente_sinal in np.random.SeedSequence(semente_referencias).spawn(n_aleatorios):
+                referencias.append(gerar_sinal_referencia(tipo, time_vector, dict(parametros),
+                                                          np.random.default_rng(semente_sinal)))
+        else:
+            referencias.append(gerar_sinal_referencia(tipo, time_vector, dict(parametros)))
+    referencias = np.array(referencias)
+    referencias.setflags(write=False)
+    return referencias
+
+def agregar_custos(custos, agregacao='media'):
+    """
+    Junta os custos (N, R) das R referências num custo por partícula (N,).
+    As três agregações não diminuem quando algum custo cresce, então o corte antecipado continua valendo
+    sobre o custo agregado.
+    """
+    if agregacao == 'media':
+        return np.mean(custos, axis=1)
+    if agregacao == 'pior':
+        return np.max(custos, axis=1)
+    if agregacao == 'cvar':
+        n_piores = max(1, int(np.ceil(alfa_cvar * custos.shape[1])))
+        return np.mean(np.sort(custos, axis=1)[:, -n_piores:], axis=1)
+    raise ValueError(f"Agregação '{agregacao}' não implementada")
+
+def simular_custos_referencias(ganhos, referencias, agregacao='media', limites=None, estatisticas=None):
+    """
+    Custo de calcular_funcao_objetivo para N ganhos em R referências, numa simulação só.
+
+    ganhos: array (N, 3) com as colunas kp, ki, kd. referencias: array (R, n) na grade de tempo da função objetivo.
+    Retorna um array (N,) com o custo de cada partícula juntado sobre as referências por agregar_custos.
+    Os estados são arrays (N, R): partículas e referências avançam juntas, uma amostra por vez.
+
+    Em vez de chamar o odeint a cada amostra, usa a solução exata do modelo dentro do passo. Com a referência,
+    o erro_acum e o d_erro constantes no passo, motor_model + motor_controller viram dx = alfa*x + beta, então
+    x(t+dt) = x + (e^(alfa*dt) - 1)/alfa * (alfa*x + beta). Fora da saturação alfa = k*a_model_error - k*kp/(k + k_model_error);
+    saturado (|v| > 12) a tensão é constante e alfa = k*a_model_error.
+    As N simulações avançam juntas como arrays, uma amostra por vez.
+
+    Quando a tensão cruza +-12 V dentro do passo, o instante do cruzamento é calculado e o passo termina no outro regime.
+    Tolerância: o fitness bate com o caminho por partícula em 5e-5 relativo, que é o erro do próprio odeint
+    com as tolerâncias padrão (contra odeint com rtol=1e-12 a diferença cai para ~1e-9).
+
+    Corte antecipado: ITA, ESA, erro dinâmico e esforço são somas de termos não negativos, então são acumulados
+    passo a passo e o custo parcial (com as penalidades de balanço, que já se sabe de início) só cresce.
+    Com limites (N,) (normalmente o pbest de cada partícula), a partícula cujo custo parcial passa do seu limite
+    para de ser simulada e sai do lote. Nesse caso retorna (custos, abortadas): para as abortadas o custo é
+    o limite inferior no instante do corte, que já é maior que o limite, então a comparação com o pbest continua certa.
+    Com várias referências o custo parcial conferido é o agregado dos parciais de cada referência.
+    estatisticas: dict opcional, acumula 'passos_simulados', 'passos_totais' (contados por partícula e referência)
+    e 'abortadas'.
+    """
+    ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+    n_part_lote = ganhos.shape[0]
+    # ganhos em coluna (N, 1) para fazer broadcast com os estados (N, R)
+    kp, ki, kd = ganhos[:, 0:1], ganhos[:, 1:2], ganhos[:, 2:3]
+    balance_penalty = penalidade_balanco(kp, ki, kd) * np.ones((n_part_lote, 1))
+
+    n = int((1 / (ts_ms / 1000.0)) * tf + 1)
+    time_vector = np.linspace(0, tf, n)
+    torque_ref = np.atleast_2d(np.asarray(referencias, dtype=float))
+    n_ref = torque_ref.shape[0]
+    passos = np.diff(time_vector)
+
+    # pesos do trapz, pro ITA ir somando amostra por amostra
+    pesos_ita = np.zeros(n)
+    pesos_ita[:-1] += passos / 2
+    pesos_ita[1:] += passos / 2
+    steady_state_start = int(0.9 * n)
+
+    ganho_tensao = k / (k + k_model_error)
+    alfa_livre = k * a_model_error - ganho_tensao * kp
+    alfa_sat = np.full_like(kp, k * a_model_error)
+
+    custos = np.zeros(n_part_lote)
+    abortadas = np.zeros(n_part_lote, dtype=bool)
+    ativas = np.arange(n_part_lote)
+    limites_ativas = None if limites is None else np.broadcast_to(np.asarray(limites, dtype=float), (n_part_lote,))
+    penalidade_ativas = balance_penalty
+
+    tau = np.zeros((n_part_lote, n_ref))
+    erro_anterior = np.zeros((n_part_lote, n_ref))
+    control_effort = np.zeros((n_part_lote, n_ref))
+    soma_ita = np.zeros((n_part_lote, n_ref))
+    soma_esa = np.zeros((n_part_lote, n_ref))
+    soma_dinamico = np.zeros((n_part_lote, n_ref))
+    passos_simulados = 0
+
+    for i in range(n):
+        erro_atual = torque_ref[:, i] - tau
+        abs_erro = np.abs(erro_atual)
+        soma_ita += pesos_ita[i] * abs_erro * time_vector[i]
+        if i >= steady_state_start:
+            soma_esa += abs_erro
+        else:
+            soma_dinamico += abs_erro
+        if i == n - 1:
+            break
+
+        h = passos[i]
+        erro_acum = (erro_atual + erro_anterior) * dt
+        d_erro = (erro_atual - erro_anterior) / dt
+
+        v = kp * erro_atual + ki * ts_ms * erro_acum + kd * d_erro
+        control_effort += np.abs(v) * dt
+
+        # tensão que o motor_controller aplica no início do passo
+        v_modelo = kp * erro_atual + ki * ts_ms * erro_acum + kd * d_erro / ts_ms
+        regime = np.where(np.abs(v_modelo) > 12.0, np.sign(v_modelo), 0.0)
+        tau_fim = _avancar_regime(tau, h, regime, v_modelo, kp, ganho_tensao, alfa_livre, alfa_sat)
+
+        # se a tensão cruzou +-12 V dentro do passo, acha o instante do cruzamento e segue no outro regime
+        v_fim = v_modelo - kp * (tau_fim - tau)
+        regime_fim = np.where(np.abs(v_fim) > 12.0, np.sign(v_fim), 0.0)
+        cruzou = regime_fim != regime
+        if np.any(cruzou):
+            nivel = np.where(regime != 0, regime, regime_fim) * 12.0
+            tau_cruz = tau + (v_modelo - nivel) / kp
+            alfa, beta = _coeficientes_regime(tau, regime, v_modelo, kp, ganho_tensao, alfa_livre, alfa_sat)
+            tau_eq = -beta / alfa
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t_cruz = np.log((tau_cruz - tau_eq) / (tau - tau_eq)) / alfa
+            t_cruz = np.clip(np.nan_to_num(t_cruz, nan=h), 0.0, h)
+            v_cruz = v_modelo - kp * (tau_cruz - tau)
+            tau_seg = _avancar_regime(tau_cruz, h - t_cruz, regime_fim, v_cruz, kp, ganho_tensao, alfa_livre, alfa_sat)
+            tau_fim = np.where(cruzou, tau_seg, tau_fim)
+
+        passos_simulados += tau.size
+        tau = tau_fim
+        erro_anterior = erro_atual
+
+        # o custo parcial é conferido a cada intervalo_corte passos, conferir todo passo custa mais do que economiza
+        if limites_ativas is not None and i % intervalo_corte == 0:
+            parcial = agregar_custos(0.5*soma_ita + 5.0*soma_esa/(n - steady_state_start)
+                                     + 2.0*soma_dinamico/steady_state_start
+                                     + penalidade_ativas + control_effort * 0.01, agregacao)
+            cortar = parcial > limites_ativas
+            if np.any(cortar):
+                custos[ativas[cortar]] = parcial[cortar]
+                abortadas[ativas[cortar]] = True
+                manter = ~cortar
+                (ativas, kp, ki, kd, alfa_livre, alfa_sat, limites_ativas, penalidade_ativas, tau, erro_anterior,
+                 control_effort, soma_ita, soma_esa, soma_dinamico) = (
+                    x[manter] for x in (ativas, kp, ki, kd, alfa_livre, alfa_sat, limites_ativas, penalidade_ativas,
+                                        tau, erro_anterior, control_effort, soma_ita, soma_esa, soma_dinamico))
+                if len(ativas) == 0:
+                    break
+
+    ita = soma_ita
+    esa = soma_esa / (n - steady_state_start)
+    erro_dinamico = soma_dinamico / steady_state_start
+    effort_penalty = control_effort * 0.01
+
+    j = 0.5*ita + 5.0*esa + 2.0*erro_dinamico
+    custos[ativas] = agregar_custos(j + penalidade_ativas + effort_penalty, agregacao)
+
+    if estatisticas is not None:
+        estatisticas['passos_simulados'] = estatisticas.get('passos_simulados', 0) + passos_simulados
+        estatisticas['passos_totais'] = estatisticas.get('passos_totais', 0) + (n - 1) * n_part_lote * n_ref
+        estatisticas['abortadas'] = estatisticas.get('abortadas', 0) + int(abortadas.sum())
+
+    if limites is None:
+        return custos
+    return custos, abortadas
+
+def penalidade_balanco(kp, ki, kd):
+    """Penalizações de calcular_funcao_objetivo escritas com np.where, aceitam escalares ou arrays de ganhos"""
+    balance_penalty = np.where(kp < ki * 0.2, (ki * 0.2 - kp) * 0.01, 0.0)
+    balance_penalty = balance_penalty + np.where(ki < 1.0, (2.0 - ki) * 2.0, 0.0)
+    balance_penalty = balance_penalty + np.where(ki > 50, (ki - 50) * 0.05, 0.0)
+    balance_penalty = balance_penalty + np.where(kd < 1.0, (1.0 - kd) * 3.0, 0.0)
+    balance_penalty = balance_penalty + np.maximum(0, kp - 80) * 0.05
+    balance_penalty = balance_penalty + np.maximum(0, ki - 40) * 0.05
+    balance_penalty = balance_penalty + np.maximum(0, kd - 8) * 0.05
+    return balance_penalty
+
+if __name__ == '__main__':
+    rng_pso, rng_sinal = [np.random.default_rng(s) for s in np.random.SeedSequence(semente).spawn(2)]
+    config_objetivo = {'objetivo': 'calcular_funcao_objetivo_lote', 'referencia': 'sin',
+                       'tf': tf, 'ts_ms': ts_ms, 'a': a, 'k': k,
+                       'a_model_error': a_model_error, 'k_model_error': k_model_error}
+    funcao_objetivo = calcular_funcao_objetivo_lote
+    if fitness_robusta:
+        config_objetivo.update({'objetivo': 'calcular_funcao_objetivo_robusta', 'referencia': sinais_robustos,
+                                'n_aleatorios': n_aleatorios, 'semente_referencias': semente_referencias,
+                                'agregacao': agregacao_robusta, 'alfa_cvar': alfa_cvar})
+        funcao_objetivo = calcular_funcao_objetivo_robusta
+    cache = CacheFitness(funcao_objetivo, config_objetivo, resolucao_cache, arquivo=arquivo_cache)
+    objetivo = cache
+    if pre_triagem_estabilidade:
+        objetivo = TriagemEstabilidade(cache, partial(polinomio_mf, a=a, k=k, a_model_error=a_model_error,
+                                                      k_model_error=k_model_error, ts_ms=ts_ms, dt=dt),
+                                       custo_instavel=custo_instavel)
+    pso = PSO(objetivo, lim, n_part, max_iter, peso_inercia, peso_local, peso_global, lote=True,
+              corte_antecipado=corte_antecipado, rng=rng_pso)
+    gbest, gbest_fit = pso.otimizar()
+    if pre_triagem_estabilidade:
+        objetivo.imprimir_estatisticas()
+    cache.imprimir_estatisticas()
+    cache.fechar()
+    print(f"Parâmetros do controlador PID: kp={gbest[0]:.3f}, ki={gbest[1]:.3f}, kd={gbest[2]:.3f}")
+
+    tf_simulacao = 5.0
+
+    # Sinal degrau
+    parametros_degrau = {'amplitude': 1.0}
+    tempo, ref, saida, controle = simular_sistema_malha_fechada(
+        connected_systems_model, gbest[0], gbest[1], gbest[2], 'degrau', parametros_degrau, a, k, ts_ms, tf_simulacao, dt,
+        controlador=motor_controller)
+    visualizar_resultados(tempo, ref, saida, controle, 'Degrau', save_dir)
+
+    # Sinal senoidal
+    parametros_senoidal = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
+    tempo, ref, saida, controle = simular_sistema_malha_fechada(
+        connected_systems_model, gbest[0], gbest[1], gbest[2], 'senoidal', parametros_senoidal, a, k, ts_ms, tf_simulacao, dt,
+        controlador=motor_controller)
+    visualizar_resultados(tempo, ref, saida, controle, 'Senoidal', save_dir)
+
+    # Sinal onda quadrada
+    parametros_quadrada = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
+    tempo, ref, saida, controle = simular_sistema_malha_fechada(
+        connected_systems_model, gbest[0], gbest[1], gbest[2], 'quadrada', parametros_quadrada, a, k, ts_ms, tf_simulacao, dt,
+        controlador=motor_controller)
+    visualizar_resultados(tempo, ref, saida, controle, 'Quadrada', save_dir)
+
+    # Sinal dente de serra
+    parametros_dente_serra = {'amplitude': 1.0, 'periodo': 1.0, 'offset': 0.0}
+    tempo, ref, saida, controle = simular_sistema_malha_fechada(
+        connected_systems_model, gbest[0], gbest[1], gbest[2], 'dente_serra', parametros_dente_serra, a, k, ts_ms, tf_simulacao, dt,
+        controlador=motor_controller)
+    visualizar_resultados(tempo, ref, saida, controle, 'Dente de Serra', save_dir)
+
+    # Sinal aleatório
+    parametros_aleatorio = {'amp_max': 1.0, 'amp_min': -1.0, 'periodo_max': 0.5, 'periodo_min': 0.1}
+    tempo, ref, saida, controle = simular_sistema_malha_fechada(
+        connected_systems_model, gbest[0], gbest[1], gbest[2], 'aleatorio', parametros_aleatorio, a, k, ts_ms, tf_simulacao, dt, rng=rng_sinal,
+        controlador=motor_controller)
+    visualizar_resultados(tempo, ref, saida, controle, 'Aleatório', save_dir)
@@ -0,0 +1,150 @@
+import numpy as np
+
+"""
+PSO (Particle Swarm Optimization) usado pelos scripts pid_MF_PSO.py, pid_MA_PSO.py e pid_TF_PSO.py.
+
+particles: cada uma é um conjunto de valores (k_p, k_i, k_d) que o algoritmo vai testar
+velocity: como cada partícula se move pelo espaço de busca
+pbest: melhor resultado que cada partícula já achou
+gbest: melhor resultado geral de todas as partículas
+
+A ideia é: cada partícula vai testando valores diferentes e se move em direção
+ao que ela achou de melhor (pbest) e ao que o grupo todo achou de melhor (gbest).
+
+Aqui o enxame inteiro fica em arrays numpy (n_part, 3), então a atualização de velocidade,
+posição, limites e re-sorteio é uma conta só para todas as partículas.
+"""
+
+class PSO:
+    def __init__(self, funcao_objetivo, lim, n_part=30, max_iter=30,
+                 peso_inercia=0.9, peso_local=1.2, peso_global=1.2,
+                 fracao_veloc_max=0.2, prob_resorteio=0.15,
+                 diversidade_min=5.0, intervalo_diversidade=3,
+                 lote=False, corte_antecipado=False, rng=None, verbose=True):
+        """
+        funcao_objetivo: com lote=False é chamada por partícula, f(kp, ki, kd) -> float;
+                         com lote=True recebe o enxame (N, 3) e devolve um array (N,).
+        lim: lista de (mínimo, máximo) de cada dimensão.
+        fracao_veloc_max: velocidade máxima de cada dimensão como fração da largura do limite.
+        prob_resorteio: chance de cada coordenada ser sorteada de novo a cada iteração.
+        diversidade_min / intervalo_diversidade: a cada intervalo_diversidade iterações, se a soma dos desvios
+                         padrão das posições ficar abaixo de diversidade_min, metade do enxame é reinicializada.
+        corte_antecipado: só com lote=True; passa o pbest de cada partícula como limite para a função objetivo,
+                         que pode parar a simulação de quem já passou do próprio pbest (ver calcular_funcao_objetivo_lote).
+        rng: numpy.random.Generator; se None cria um novo.
+        """
+        self.funcao_objetivo = funcao_objetivo
+        self.lim = np.asarray(lim, dtype=float)
+        self.lim_inf = self.lim[:, 0]
+        self.lim_sup = self.lim[:, 1]
+        self.dim = len(self.lim)
+        self.n_part = n_part
+        self.max_iter = max_iter
+
+        self.peso_inercia = peso_inercia
+        self.peso_local = peso_local
+        self.peso_global = peso_global
+        self.veloc_max = (self.lim_sup - self.lim_inf) * fracao_veloc_max
+        self.prob_resorteio = prob_resorteio
+        self.diversidade_min = diversidade_min
+        self.intervalo_diversidade = intervalo_diversidade
+
+        self.lote = lote
+        self.corte_antecipado = corte_antecipado and lote
+        self.estatisticas_corte = {}
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.verbose = verbose
+
+        self.particles = None
+        self.velocity = None
+        self.pbest = None
+        self.pbest_fit = None
+        self.gbest = None
+        self.gbest_fit = float('inf')
+        self.historico = []
+
+    def sortear_posicoes(self, n):
+        return self.rng.uniform(self.lim_inf, self.lim_sup, (n, self.dim))
+
+    def sortear_velocidades(self, n):
+        return self.rng.uniform(-self.veloc_max, self.veloc_max, (n, self.dim))
+
+    def avaliar(self, particulas, limites=None):
+        """Fitness de todas as partículas, numa chamada só (lote) ou uma chamada por partícula.
+        Com limites, valores de partículas abortadas são só um limite inferior maior que o limite."""
+        if self.lote and limites is not None:
+            fits, _ = self.funcao_objetivo(particulas, limites=limites, estatisticas=self.estatisticas_corte)
+            return np.asarray(fits, dtype=float)
+        if self.lote:
+            return np.asarray(self.funcao_objetivo(particulas), dtype=float)
+        return np.array([self.funcao_objetivo(*p) for p in particulas], dtype=float)
+
+    def atualizar_enxame(self):
+        """Velocidade, posição, limites e re-sorteio de 15% das coordenadas, tudo vetorizado"""
+        r1 = self.rng.random((self.n_part, self.dim))
+        r2 = self.rng.random((self.n_part, self.dim))
+        self.velocity = (self.peso_inercia*self.velocity +
+                         self.peso_local*r1*(self.pbest - self.particles) +
+                         self.peso_global*r2*(self.gbest - self.particles))
+        self.velocity = np.clip(self.velocity, -self.veloc_max, self.veloc_max)
+        self.particles = np.clip(self.particles + self.velocity, self.lim_inf, self.lim_sup)
+
+        resorteio = self.rng.random((self.n_part, self.dim)) < self.prob_resorteio
+        self.particles = np.where(resorteio, self.sortear_posicoes(self.n_part), self.particles)
+
+    def verificar_diversidade(self, it):
+        diversity = np.sum(np.std(self.particles, axis=0))
+        if diversity < self.diversidade_min:
+            if self.verbose:
+                print(f"Baixa diversidade na iter {it}, reinicializando...")
+            metade = self.n_part // 2
+            self.particles[:metade] = self.sortear_posicoes(metade)
+            self.velocity[:metade] = self.sortear_velocidades(metade)
+
+    def otimizar(self):
+        self.particles = self.sortear_posicoes(self.n_part)
+        self.velocity = self.sortear_velocidades(self.n_part)
+        self.pbest = self.particles.copy()
+        self.pbest_fit = self.avaliar(self.particles)
+
+        i = np.argmin(self.pbest_fit)
+        self.gbest = self.pbest[i].copy()
+        self.gbest_fit = self.pbest_fit[i]
+        if self.verbose:
+            print("Busca Inicial:", self.gbest.tolist(), self.gbest_fit)
+
+        for it in range(self.max_iter):
+            # abortada tem fit > pbest, então não entra em melhorou
+            fits = self.avaliar(self.particles, self.pbest_fit if self.corte_antecipado else None)
+            melhorou = fits < self.pbest_fit
+            self.pbest[melhorou] = self.particles[melhorou]
+            self.pbest_fit[melhorou] = fits[melhorou]
+
+            i = np.argmin(self.pbest_fit)
+            if self.pbest_fit[i] < self.gbest_fit:
+                self.gbest = self.pbest[i].copy()
+                self.gbest_fit = self.pbest_fit[i]
+                if self.verbose:
+                    print(f"Nova melhor solução na iter {it}: kp={self.gbest[0]:.3f}, ki={self.gbest[1]:.3f}, "
+                          f"kd={self.gbest[2]:.3f} | fit={self.gbest_fit:.10f}")
+
+            self.atualizar_enxame()
+
+            if it % self.intervalo_diversidade == 0:
+                self.verificar_diversidade(it)
+
+            self.historico.append(self.gbest_fit)
+
+        if self.verbose:
+            print("Final:", self.gbest.tolist(), self.gbest_fit)
+            if self.corte_antecipado:
+                self.imprimir_estatisticas_corte()
+        return self.gbest, self.gbest_fit
+
+    def imprimir_estatisticas_corte(self):
+        e = self.estatisticas_corte
+        if not e.get('passos_totais'):
+            return
+        economizados = e['passos_totais'] - e['passos_simulados']
+        print(f"Corte antecipado: {e['abortadas']} avaliações abortadas, {economizados} de {e['passos_totais']} "
+              f"passos economizados ({100*economizados/e['passos_totais']:.1f}%)")
@@ -1,11 +1,108 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from functools import lru_cache
 
 from scipy.integrate import odeint
 from scipy import signal
 
-def gerar_sinal_referencia(tipo_sinal, tempo, parametros):
+class PlantaZOH:
+    """
+    Motor de primeira ordem (motor_model: dx = -a*k*x + k*u) discretizado com segurador de ordem zero.
+
+    Com u constante durante o passo dt a solução é exata: x[i+1] = phi*x[i] + gamma*u[i],
+    com phi = e^(-a*k*dt) e gamma = (1 - phi)/a. O par (phi, gamma) é calculado uma vez só e cada
+    passo custa duas multiplicações e uma soma, no lugar de uma chamada do odeint.
+    """
+    def __init__(self, a, k, dt):
+        self.a = a
+        self.k = k
+        self.dt = dt
+        self.phi = np.exp(-a * k * dt)
+        self.gamma = (1 - self.phi) / a if a != 0 else k * dt
+
+    def avancar(self, x, u):
+        return self.phi * x + self.gamma * u
+
+@lru_cache(maxsize=None)
+def obter_planta_zoh(a, k, dt):
+    """Devolve a PlantaZOH de (a, k, dt), calculando (phi, gamma) só na primeira vez"""
+    return PlantaZOH(a, k, dt)
+
+# Planta do pid_TF_PSO: (-0.3183 s + 1) / (0.1013 s^2 + 0.0318 s + 1), zero no semiplano direito
+num_planta_tf = (-0.3183, 1)
+den_planta_tf = (0.1013, 0.0318, 1)
+
+class PlantaTF:
+    """
+    Função de transferência contínua num/den em espaço de estados discreto, com segurador de ordem zero.
+
+    signal.tf2ss dá a realização contínua e signal.cont2discrete(..., 'zoh') a discreta, exata com u constante
+    durante o passo: x[i+1] = Ad x[i] + Bd u[i], y[i] = Cd x[i] + Dd u[i].
+    O estado fica num array (N, ordem), então N simulações (um enxame de ganhos) avançam juntas.
+    Para uma simulação só, avancar_escalar e saida_escalar fazem o mesmo passo com listas de float.
+
+    bd, cd e dd: Bd, Cd e Dd de entrada e saída únicas como vetor, vetor e escalar.
+    """
+    def __init__(self, num, den, dt):
+        self.num = num
+        self.den = den
+        self.dt = dt
+        A, B, C, D = signal.tf2ss(num, den)
+        self.Ad, self.Bd, self.Cd, self.Dd, _ = signal.cont2discrete((A, B, C, D), dt, method='zoh')
+        self.ordem = self.Ad.shape[0]
+        self.bd = self.Bd[:, 0].copy()
+        self.cd = self.Cd[0].copy()
+        self.dd = float(self.Dd[0, 0])
+        self._AdT = np.ascontiguousarray(self.Ad.T)
+        self._Ad_lista = self.Ad.tolist()
+        self._bd_lista = self.bd.tolist()
+        self._cd_lista = self.cd.tolist()
+
+    def estado_inicial(self, n=1):
+        return np.zeros((n, self.ordem))
+
+    def avancar(self, x, u):
+        """x (N, ordem) e u (N,) -> estado no fim do passo"""
+        return x @ self._AdT + u[:, None] * self.bd
+
+    def saida(self, x, u):
+        return x @ self.cd + self.dd * u
+
+    def avancar_escalar(self, x, u):
+        """x (lista com ordem floats) e u float -> estado no fim do passo, sem arrays numpy"""
+        return [sum(a * xm for a, xm in zip(linha, x)) + b * u for linha, b in zip(self._Ad_lista, self._bd_lista)]
+
+    def saida_escalar(self, x, u):
+        return sum(c * xj for c, xj in zip(self._cd_lista, x)) + self.dd * u
+
+@lru_cache(maxsize=None)
+def obter_planta_tf(num, den, dt):
+    """Devolve a PlantaTF de (num, den, dt), discretizando só na primeira vez (num e den como tuplas)"""
+    return PlantaTF(tuple(num), tuple(den), dt)
+
+def _avancar_passo(connected_systems_model, x, t_span, args, a, k, dt, integrador, controlador=None):
+    """
+    Avança um passo de simulação com o integrador escolhido, a partir do estado escalar x.
+
+    'zoh': a planta é motor_model(a, k) (PlantaZOH) e a tensão controlador(x, *args) é amostrada no início
+    do passo e mantida até o fim (controle digital). O controlador é obrigatório nesse modo.
+    'odeint': integra o connected_systems_model com o odeint, mantido como referência para validação.
+    """
+    if integrador == 'zoh':
+        if controlador is None:
+            raise ValueError("integrador 'zoh' precisa do controlador (a função que dá a tensão do motor, "
+                             "ex.: motor_controller); sem ele use integrador='odeint'")
+        planta = obter_planta_zoh(a, k, dt)
+        return planta.avancar(x, controlador(x, *args))
+    elif integrador == 'odeint':
+        out_states = odeint(connected_systems_model, [x], t_span, args=args)
+        return out_states[-1, 0]
+    else:
+        raise ValueError(f"Integrador '{integrador}' não implementado")
+
+def gerar_sinal_referencia(tipo_sinal, tempo, parametros, rng=None):
+    """rng: numpy.random.Generator usado pelo sinal 'aleatorio'; sem ele usa o estado global do np.random"""
     if tipo_sinal == 'degrau':
         amplitude = parametros.get('amplitude', 1.0)
         return amplitude * np.ones_like(tempo)
@@ -40,15 +137,16 @@ def gerar_sinal_referencia(tipo_sinal, tempo, parametros):
         periodo_max = parametros.get('periodo_max', 0.5)
         periodo_min = parametros.get('periodo_min', 0.1)
         
+        rng = np.random if rng is None else rng
         signal = np.zeros_like(tempo)
         current_time = 0
-        current_value = np.random.uniform(amp_min, amp_max)
+        current_value = rng.uniform(amp_min, amp_max)
         signal[0] = current_value
         
         for i in range(1, len(tempo)):
             if tempo[i] >= current_time:
-                current_time += np.random.uniform(periodo_min, periodo_max)
-                current_value = np.random.uniform(amp_min, amp_max)
+                current_time += rng.uniform(periodo_min, periodo_max)
+                current_value = rng.uniform(amp_min, amp_max)
             signal[i] = current_value
         
         return signal
@@ -56,28 +154,37 @@ def gerar_sinal_referencia(tipo_sinal, tempo, parametros):
     else:
         raise ValueError(f"Tipo de sinal '{tipo_sinal}' não implementado")
 
-def simular_sistema_malha_fechada(connected_systems_model, kp, ki, kd, tipo_sinal, parametros_sinal, a, k, ts_ms, tf, dt):
+def simular_sistema_malha_fechada(connected_systems_model, kp, ki, kd, tipo_sinal, parametros_sinal, a, k, ts_ms, tf, dt,
+                                  integrador='zoh', rng=None, controlador=None):
     """
     Simula o sistema em malha fechada com os parâmetros otimizados do controlador PID
+
+    integrador: 'zoh' (padrão, PlantaZOH) ou 'odeint' (referência para validação)
+    controlador: função da tensão do motor, controlador(x, tau_ref, taup_ref, erro_acum, d_erro, kp, ki, kd),
+    a mesma que o connected_systems_model usa (motor_controller). Obrigatória com 'zoh', que supõe a planta
+    motor_model com os a e k dados.
+    rng: numpy.random.Generator repassado a gerar_sinal_referencia (sinal 'aleatorio')
     """
     n = int((1 / (ts_ms / 1000.0)) * tf + 1)
     time_vector = np.linspace(0, tf, n)
     
-    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal)
+    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal, rng)
+    # listas de float deixam o laço bem mais leve que indexar arrays numpy amostra por amostra
+    ref = torque_ref.tolist()
+    tempo = time_vector.tolist()
     
-    states = np.zeros((n, 1))
-    states[0] = [0]
+    states = [0.0] * n
     erro_anterior = 0
     erro_acum = 0
     control_signals = np.zeros(n)
     
     for i in range(n-1):
-        t_span = [time_vector[i], time_vector[i+1]]
-        tau = states[i, 0]
-        tau_ref_i = torque_ref[i]
+        t_span = [tempo[i], tempo[i+1]]
+        tau = states[i]
+        tau_ref_i = ref[i]
         
         if i < n-2:
-            taup_ref_i = (torque_ref[i+1] - torque_ref[i]) / (time_vector[i+1] - time_vector[i])
+            taup_ref_i = (ref[i+1] - ref[i]) / (tempo[i+1] - tempo[i])
         else:
             taup_ref_i = 0
         
@@ -93,34 +200,37 @@ def simular_sistema_malha_fechada(connected_systems_model, kp, ki, kd, tipo_sina
             erro_acum = erro_acum - erro_atual * dt
             control_signals[i] = v
         
-        out_states = odeint(connected_systems_model, states[i], t_span,
-                          args=(tau_ref_i, taup_ref_i, erro_acum, d_erro, kp, ki, kd))
-        states[i+1] = out_states[-1]
+        states[i+1] = _avancar_passo(connected_systems_model, states[i], t_span,
+                                     (tau_ref_i, taup_ref_i, erro_acum, d_erro, kp, ki, kd), a, k, dt, integrador,
+                                     controlador)
         erro_anterior = erro_atual
     
-    erro_atual = torque_ref[-1] - states[-1, 0]
+    erro_atual = torque_ref[-1] - states[-1]
     v = kp * erro_atual + ki * ts_ms * erro_acum + kd * d_erro / ts_ms
     control_signals[-1] = v if abs(v) <= 12.0 else np.sign(v) * 12.0
     
-    return time_vector, torque_ref, states[:, 0], control_signals
+    return time_vector, torque_ref, np.array(states), control_signals
 
-def simular_sistema_malha_aberta(connected_systems_model, kp, ki, kd, tipo_sinal, parametros_sinal, a, k, ts_ms, tf, dt):
+def simular_sistema_malha_aberta(connected_systems_model, kp, ki, kd, tipo_sinal, parametros_sinal, a, k, ts_ms, tf, dt,
+                                 integrador='zoh', rng=None, controlador=None):
+    """Malha aberta; integrador, rng e controlador como em simular_sistema_malha_fechada"""
     n = int((1 / (ts_ms / 1000.0)) * tf + 1)
     time_vector = np.linspace(0, tf, n)
     
-    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal)
+    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal, rng)
+    ref = torque_ref.tolist()
+    tempo = time_vector.tolist()
     
-    states = np.zeros((n, 1))
-    states[0] = [0]
+    states = [0.0] * n
     erro_acum = 0
     control_signals = np.zeros(n)
     
     for i in range(n-1):
-        t_span = [time_vector[i], time_vector[i+1]]
-        tau_ref_i = torque_ref[i]
+        t_span = [tempo[i], tempo[i+1]]
+        tau_ref_i = ref[i]
         
         if i < n-2:
-            taup_ref_i = (torque_ref[i+1] - torque_ref[i]) / (time_vector[i+1] - time_vector[i])
+            taup_ref_i = (ref[i+1] - ref[i]) / (tempo[i+1] - tempo[i])
         else:
             taup_ref_i = 0
         
@@ -135,47 +245,90 @@ def simular_sistema_malha_aberta(connected_systems_model, kp, ki, kd, tipo_sinal
             v = np.sign(v) * 12.0
             control_signals[i] = v
         
-        out_states = odeint(connected_systems_model, states[i], t_span,
-                          args=(tau_ref_i, taup_ref_i, erro_acum, d_erro, kp, ki, kd))
-        states[i+1] = out_states[-1]
+        states[i+1] = _avancar_passo(connected_systems_model, states[i], t_span,
+                                     (tau_ref_i, taup_ref_i, erro_acum, d_erro, kp, ki, kd), a, k, dt, integrador,
+                                     controlador)
     
     v = kp * torque_ref[-1] + ki * ts_ms * erro_acum + kd * d_erro / ts_ms
     control_signals[-1] = v if abs(v) <= 12.0 else np.sign(v) * 12.0
     
-    return time_vector, torque_ref, states[:, 0], control_signals
+    return time_vector, torque_ref, np.array(states), control_signals
 
-def simular_sistema_funcao_transferencia(kp, ki, kd, tipo_sinal, parametros_sinal, ts_ms, tf, dt):
+def simular_funcao_transferencia_lote(ganhos, tipo_sinal, parametros_sinal, ts_ms, tf, dt, rng=None,
+                                      num=num_planta_tf, den=den_planta_tf):
+    """
+    Malha fechada do PID com a planta num/den (PlantaTF) para N conjuntos de ganhos de uma vez.
+
+    ganhos: array (N, 3) com as colunas kp, ki, kd.
+    Retorna tempo (n,), referência (n,), saídas (N, n) e sinais de controle (N, n).
+    A cada amostra o PID usa o erro da amostra anterior, a tensão (saturada em +-12 V) fica constante
+    durante o passo e a saída é a da planta no fim dele.
+    """
+    ganhos = np.atleast_2d(np.asarray(ganhos, dtype=float))
+    kp, ki, kd = ganhos[:, 0], ganhos[:, 1], ganhos[:, 2]
     n = int((1 / (ts_ms / 1000.0)) * tf + 1)
     time_vector = np.linspace(0, tf, n)
-    
-    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal)
-    
-    y = np.zeros_like(time_vector)
-    control_signal = np.zeros_like(time_vector)
+
+    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal, rng)
+
+    planta = obter_planta_tf(tuple(num), tuple(den), dt)
+    x = planta.estado_inicial(len(ganhos))
+    y = np.zeros((len(ganhos), n))
+    control_signal = np.zeros((len(ganhos), n))
+    erro_acum = np.zeros(len(ganhos))
+    erro_anterior = np.zeros(len(ganhos))
+
+    for i in range(1, n):
+        erro = torque_ref[i-1] - y[:, i-1]
+        erro_acum += erro * dt
+        d_erro = (erro - erro_anterior) / dt
+
+        u = kp * erro + ki * erro_acum + kd * d_erro
+        u = np.minimum(np.maximum(u, -12.0), 12.0)  # np.clip custa mais que isso em arrays pequenos
+        control_signal[:, i] = u
+
+        x = planta.avancar(x, u)
+        y[:, i] = planta.saida(x, u)
+
+        erro_anterior = erro
+
+    return time_vector, torque_ref, y, control_signal
+
+def simular_sistema_funcao_transferencia(kp, ki, kd, tipo_sinal, parametros_sinal, ts_ms, tf, dt, rng=None,
+                                         num=num_planta_tf, den=den_planta_tf):
+    """
+    Mesma malha de simular_funcao_transferencia_lote para um conjunto de ganhos só.
+    Com um ganho o laço em floats (PlantaTF.avancar_escalar) sai umas 5 vezes mais barato que o lote com N = 1,
+    que opera arrays numpy de tamanho 1 a cada amostra.
+    """
+    n = int((1 / (ts_ms / 1000.0)) * tf + 1)
+    time_vector = np.linspace(0, tf, n)
+
+    torque_ref = gerar_sinal_referencia(tipo_sinal, time_vector, parametros_sinal, rng)
+    ref = torque_ref.tolist()
+
+    planta = obter_planta_tf(tuple(num), tuple(den), dt)
+    x = [0.0] * planta.ordem
+    y = [0.0] * n
+    control_signal = [0.0] * n
     erro_acum = 0
     erro_anterior = 0
-    
-    num_planta = [-0.3183, 1]
-    den_planta = [0.1013, 0.0318, 1]
-    H = signal.TransferFunction(num_planta, den_planta)
-    
-    _, y_step = signal.step(H)
-    ganho_dc = y_step[-1]
-    
-    for i in range(1, len(time_vector)):
-        erro = torque_ref[i-1] - y[i-1]
+
+    for i in range(1, n):
+        erro = ref[i-1] - y[i-1]
         erro_acum += erro * dt
         d_erro = (erro - erro_anterior) / dt
-        
+
         u = kp * erro + ki * erro_acum + kd * d_erro
-        u = np.clip(u, -12.0, 12.0)
+        u = min(max(u, -12.0), 12.0)
         control_signal[i] = u
-        
-        y[i] = ganho_dc * u
-        
+
+        x = planta.avancar_escalar(x, u)
+        y[i] = planta.saida_escalar(x, u)
+
         erro_anterior = erro
-    
-    return time_vector, torque_ref, y, control_signal
+
+    return time_vector, torque_ref, np.array(y), np.array(control_signal)
 
 def visualizar_resultados(time_vector, reference, output, control_signal, tipo_sinal, save_dir=None):
     plt.figure(figsize=(12, 8))
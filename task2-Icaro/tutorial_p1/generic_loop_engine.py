@@ -0,0 +1,132 @@
+"""
+    Motor discreto da malha fechada genérica (planta de primeira ordem + PID com estado integral)
+
+    Os tutoriais integram connected_systems_model com um odeint por amostra. Com a referência e a
+    derivada da referência constantes dentro do passo, a malha fechada é linear:
+
+        ds/dt = A s + B w,   s = [saída, integral do erro],   w = [referência, derivada da referência]
+
+    Então o passo exato é s[i+1] = Ad s[i] + Bd w[i], com [[Ad, Bd], [0, I]] = expm([[A, B], [0, 0]] * passo).
+    A discretização é feita uma vez por conjunto de ganhos (expm em lote, N matrizes 4x4) e a propagação
+    avança todos os conjuntos juntos. O sinal de controle (generic_controller) sai do mesmo laço.
+"""
+
+import numpy as np
+from scipy.linalg import expm
+
+
+def closed_loop_matrices(gains, plant_a, plant_b, plant_a_error, plant_b_error):
+    """A (N, 2, 2) e B (N, 2, 2) da malha contínua para os ganhos (N, 3) = [kp, ki, kd]"""
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    kp, ki, kd = gains.T
+    num_gains = len(gains)
+    g = plant_b / (plant_b + plant_b_error)
+
+    # dx/dt = -a*x + b*u, u = (kp*(r - x) + ki*z + kd*r_dot + (a + a_error)*x) / (b + b_error); dz/dt = r - x
+    A = np.zeros((num_gains, 2, 2))
+    A[:, 0, 0] = -plant_a + g * (plant_a + plant_a_error - kp)
+    A[:, 0, 1] = g * ki
+    A[:, 1, 0] = -1.0
+
+    B = np.zeros((num_gains, 2, 2))
+    B[:, 0, 0] = g * kp
+    B[:, 0, 1] = g * kd
+    B[:, 1, 0] = 1.0
+    return A, B
+
+
+def discretize_closed_loop(gains, step, plant_a, plant_b, plant_a_error, plant_b_error):
+    """
+    Ad (N, 2, 2) e Bd (N, 2, 2) exatos para o passo, com a referência mantida constante no passo.
+    Um expm por conjunto de ganhos: a linha i sai com os mesmos bits para qualquer N, então dividir o enxame
+    entre processos não muda o resultado.
+    """
+    A, B = closed_loop_matrices(gains, plant_a, plant_b, plant_a_error, plant_b_error)
+    augmented = np.zeros((len(A), 4, 4))
+    augmented[:, :2, :2] = A
+    augmented[:, :2, 2:] = B
+    transition = np.array([expm(matrix * step) for matrix in augmented]).reshape(len(A), 4, 4)
+    return transition[:, :2, :2], transition[:, :2, 2:]
+
+
+def simulate_closed_loop_batch(gains, output_ref, output_dot_ref, step,
+                               plant_a, plant_b, plant_a_error, plant_b_error):
+    """
+    Simula N conjuntos de ganhos na mesma referência, como o laço de odeint dos tutoriais:
+    a amostra i usa output_ref[i] e output_dot_ref[i] durante um passo e guarda o estado no fim dele.
+
+    Retorna states (N, T, 2) e control_signals (N, T), com T = len(output_ref) - 1, contíguos por linha: as
+    reduções ao longo do tempo (np.mean, np.sum) somam cada linha na mesma ordem para qualquer N.
+    control_signals[:, i] é generic_controller(states[:, i, 0], output_ref[i], output_dot_ref[i], states[:, i, 1]).
+    """
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    kp, ki, kd = gains.T
+    Ad, Bd = discretize_closed_loop(gains, step, plant_a, plant_b, plant_a_error, plant_b_error)
+
+    num_steps = len(output_ref) - 1
+    reference = np.asarray(output_ref[:num_steps], dtype=float)
+    reference_dot = np.asarray(output_dot_ref[:num_steps], dtype=float)
+
+    # termos de entrada de todos os passos de uma vez: (T, N)
+    input_output = np.outer(reference, Bd[:, 0, 0]) + np.outer(reference_dot, Bd[:, 0, 1])
+    input_integral = np.outer(reference, Bd[:, 1, 0]) + np.outer(reference_dot, Bd[:, 1, 1])
+
+    # u = c_out*x + c_int*z + kp*r + kd*r_dot, tudo dividido por (b + b_error)
+    gain_control = 1.0 / (plant_b + plant_b_error)
+    c_out = (plant_a + plant_a_error - kp) * gain_control
+    c_int = ki * gain_control
+    control_input = (np.outer(reference, kp) + np.outer(reference_dot, kd)) * gain_control
+
+    a00, a01, a10, a11 = Ad[:, 0, 0], Ad[:, 0, 1], Ad[:, 1, 0], Ad[:, 1, 1]
+    output = np.zeros(len(gains))
+    integral = np.zeros(len(gains))
+    states = np.empty((num_steps, 2, len(gains)))
+    control_signals = np.empty((num_steps, len(gains)))
+
+    for i in range(num_steps):
+        output, integral = (a00 * output + a01 * integral + input_output[i],
+                            a10 * output + a11 * integral + input_integral[i])
+        states[i, 0] = output
+        states[i, 1] = integral
+        control_signals[i] = c_out * output + c_int * integral + control_input[i]
+
+    return np.ascontiguousarray(states.transpose(2, 0, 1)), np.ascontiguousarray(control_signals.T)
+
+
+def compare_with_odeint(gain_sets=None, reference_types=('step', 'sine', 'ramp', 'square')):
+    """Maior diferença absoluta (saída, integral, controle) entre este motor e o odeint do plant_controller_goodhart"""
+    import contextlib
+    import io
+    import time
+    with contextlib.redirect_stdout(io.StringIO()):
+        import plant_controller_goodhart as goodhart
+
+    if gain_sets is None:
+        gain_sets = [[1.0, 0.0, 0.1], [5.0, 2.0, 0.5], [15.0, 8.0, 3.0], [0.1, 10.0, 5.0], [20.0, 0.0, 0.0]]
+    original_type = goodhart.reference_type
+    try:
+        for reference_type in reference_types:
+            goodhart.reference_type = reference_type
+            _, _, output_ref, output_dot_ref = goodhart.current_reference()
+
+            start = time.perf_counter()
+            reference = [goodhart.simulate_closed_loop(params, engine='odeint') for params in gain_sets]
+            time_odeint = time.perf_counter() - start
+
+            start = time.perf_counter()
+            states, control = simulate_closed_loop_batch(gain_sets, output_ref, output_dot_ref, goodhart.tf / goodhart.n,
+                                                         goodhart.plant_a, goodhart.plant_b,
+                                                         goodhart.plant_a_error, goodhart.plant_b_error)
+            time_discrete = time.perf_counter() - start
+
+            error_output = max(np.max(np.abs(states[j, :, 0] - ref[0][:, 0])) for j, ref in enumerate(reference))
+            error_integral = max(np.max(np.abs(states[j, :, 1] - ref[0][:, 1])) for j, ref in enumerate(reference))
+            error_control = max(np.max(np.abs(control[j] - ref[1])) for j, ref in enumerate(reference))
+            print(f"{reference_type:7s} saída {error_output:.2e}  integral {error_integral:.2e}  controle {error_control:.2e}"
+                  f"  | odeint {time_odeint * 1e3:.1f} ms, discreto {time_discrete * 1e3:.2f} ms ({len(gain_sets)} ganhos)")
+    finally:
+        goodhart.reference_type = original_type
+
+
+if __name__ == "__main__":
+    compare_with_odeint()
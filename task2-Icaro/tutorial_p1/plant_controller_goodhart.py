@@ -8,8 +8,12 @@
 """
 
 import numpy as np
+import os
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from generic_loop_engine import simulate_closed_loop_batch
 import time
 
 # =============================================================================
@@ -29,6 +33,11 @@ reference_type = 'step'  # melhor para avaliar performance PID
 reference_amplitude = 1.0
 reference_frequency = 1.0
 
+# Avaliação paralela das partículas (None = serial, ex.: os.cpu_count() nas máquinas de tuning)
+num_workers = None
+random_seed = None  # semente do PSO; com semente o resultado não depende de num_workers
+integrator = 'discrete'  # 'discrete' (generic_loop_engine, passo exato) ou 'odeint' (referência para validação)
+
 print("=== OTIMIZAÇÃO PID COM PSO ===")
 print(f"Sistema: dx/dt = -{plant_a}*x + {plant_b}*u")
 print(f"Referência: {reference_type}")
@@ -80,272 +89,305 @@ def connected_systems_model(states, t, output_ref, output_dot_ref, pid_params):
 # FUNÇÃO OBJETIVO COM LEI DE GOODHART
 # =============================================================================
 
+# Colunas da matriz de métricas (N, 17), na mesma ordem do dicionário de calculate_goodhart_metrics
+metric_names = (
+    'rmse', 'mae', 'max_error',                                     # Precisão
+    'error_variance', 'control_variance', 'control_smoothness',     # Estabilidade
+    'max_control', 'total_control_effort',                          # Robustez
+    'overshoot', 'settling_time', 'rise_time',                      # Performance Dinâmica
+    'isu', 'iae', 'ise', 'itae',                                    # Eficiência Energética
+    'steady_state_std', 'error_control_correlation'                 # Consistência
+)
+metric_index = {name: i for i, name in enumerate(metric_names)}
+
+# Pesos padrão baseados na importância relativa (Lei de Goodhart)
+default_weights = {
+    # Precisão (40% do peso total)
+    'rmse': 0.25,
+    'mae': 0.10,
+    'max_error': 0.05,
+
+    # Estabilidade (25% do peso total)
+    'error_variance': 0.10,
+    'control_variance': 0.08,
+    'control_smoothness': 0.07,
+
+    # Robustez (15% do peso total)
+    'max_control': 0.08,
+    'total_control_effort': 0.07,
+
+    # Performance Dinâmica (10% do peso total)
+    'overshoot': 0.05,
+    'settling_time': 0.03,
+    'rise_time': 0.02,
+
+    # Eficiência Energética (5% do peso total)
+    'isu': 0.02,
+    'iae': 0.01,
+    'ise': 0.01,
+    'itae': 0.01,
+
+    # Consistência (5% do peso total)
+    'steady_state_std': 0.03,
+    'error_control_correlation': 0.02
+}
+
+# Fatores de normalização (valores típicos esperados), para evitar dominação por valores grandes
+normalization_factors = {
+    'rmse': 1.0,
+    'mae': 1.0,
+    'max_error': 2.0,
+    'error_variance': 0.1,
+    'control_variance': 100.0,
+    'control_smoothness': 10.0,
+    'max_control': 50.0,
+    'total_control_effort': 1000.0,
+    'overshoot': 50.0,  # percentage
+    'settling_time': 5.0,  # seconds
+    'rise_time': 2.0,  # seconds
+    'isu': 1000.0,
+    'iae': 10.0,
+    'ise': 5.0,
+    'itae': 50.0,
+    'steady_state_std': 0.1,
+    'error_control_correlation': 1.0
+}
+
+@lru_cache(maxsize=None)
+def reference_signals(tf, n, reference_type, amplitude, frequency):
+    """
+    Vetor de tempo, passo, referência e derivada da referência de uma configuração.
+    Calculados uma vez só por configuração (os arrays voltam somente leitura, são compartilhados).
+    """
+    time_vector = np.linspace(0, tf, n)
+    t_sim_step = time_vector[1] - time_vector[0]
+    output_ref = generate_reference_signal(time_vector, reference_type, amplitude, frequency)
+
+    if reference_type == 'sine':
+        output_dot_ref = amplitude * frequency * np.cos(frequency * time_vector)
+    else:
+        output_dot_ref = np.gradient(output_ref, t_sim_step)
+
+    for array in (time_vector, output_ref, output_dot_ref):
+        array.setflags(write=False)
+    return time_vector, t_sim_step, output_ref, output_dot_ref
+
+def current_reference():
+    """reference_signals da configuração atual do módulo (tf, n, reference_type, ...)"""
+    return reference_signals(tf, n, reference_type, reference_amplitude, reference_frequency)
+
+def simulate_closed_loop_swarm(gains, engine=None):
+    """
+    Simula N conjuntos de ganhos (N, 3); retorna estados (N, n-1, 2) e sinais de controle (N, n-1).
+    engine: 'discrete' avança o enxame inteiro junto pelo generic_loop_engine; 'odeint' simula um por um.
+    Sem engine usa o global integrator do módulo.
+    """
+    engine = integrator if engine is None else engine
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    _, _, output_ref, output_dot_ref = current_reference()
+    if engine == 'discrete':
+        return simulate_closed_loop_batch(gains, output_ref, output_dot_ref, tf/n,
+                                          plant_a, plant_b, plant_a_error, plant_b_error)
+    elif engine == 'odeint':
+        simulations = [simulate_closed_loop_odeint(params) for params in gains]
+        return np.array([states for states, _ in simulations]), np.array([control for _, control in simulations])
+    else:
+        raise ValueError(f"Integrador '{engine}' não implementado")
+
+def simulate_closed_loop(pid_params, engine=None):
+    """Simula um conjunto de ganhos; retorna estados (n-1, 2) e sinais de controle (n-1,)"""
+    states, control_signals = simulate_closed_loop_swarm([pid_params], engine)
+    return states[0], control_signals[0]
+
+def simulate_closed_loop_odeint(pid_params):
+    """Simula o sistema com odeint, um passo por amostra (referência para validar o motor discreto)"""
+    kp, ki, kd = pid_params
+    _, _, output_ref, output_dot_ref = current_reference()
+
+    # Condições iniciais
+    states0 = [0.0, 0.0]
+    states = np.zeros((n-1, 2))
+    control_signals = np.zeros(n-1)
+
+    # Simular sistema e coletar sinais de controle
+    for i in range(n-1):
+        out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
+                          args=(output_ref[i], output_dot_ref[i], pid_params))
+        states0 = out_states[-1, :]
+        states[i] = out_states[-1, :]
+
+        # Calcular sinal de controle
+        control_signals[i] = generic_controller(states[i, 0], output_ref[i],
+                                              output_dot_ref[i], states[i, 1], kp, ki, kd)
+    return states, control_signals
+
+def goodhart_metrics_batch(error_signals, control_signals, outputs=None):
+    """
+    Métricas de Goodhart de N trajetórias de uma vez, só com operações de array.
+
+    error_signals, control_signals: arrays (N, T), com T = n-1 amostras (como em simulate_closed_loop)
+    outputs: saída do sistema (N, T); se None, vem de output_ref[:-1] - error_signals
+
+    Retorna a matriz (N, 17) com as colunas na ordem de metric_names.
+    O tempo de acomodação sai de uma varredura de trás para frente: a última amostra fora da faixa de 2%
+    por trajetória, O(T), em vez de testar o resto do sinal a partir de cada amostra dentro da faixa.
+    """
+    error_signals = np.atleast_2d(error_signals)
+    control_signals = np.atleast_2d(control_signals)
+    time_vector, t_sim_step, output_ref, _ = current_reference()
+    num_signals, num_samples = error_signals.shape
+    if outputs is None:
+        outputs = output_ref[:num_samples] - error_signals
+    outputs = np.atleast_2d(outputs)
+    times = time_vector[:num_samples]
+
+    metrics = np.empty((num_signals, len(metric_names)))
+    column = lambda name: metrics[:, metric_index[name]]
+    abs_error = np.abs(error_signals)
+    abs_control = np.abs(control_signals)
+
+    # 1. Precisão
+    column('rmse')[:] = np.sqrt(np.mean(error_signals**2, axis=1))
+    column('mae')[:] = np.mean(abs_error, axis=1)
+    column('max_error')[:] = np.max(abs_error, axis=1)
+
+    # 2. Estabilidade
+    column('error_variance')[:] = np.var(error_signals, axis=1)
+    column('control_variance')[:] = np.var(control_signals, axis=1)
+    column('control_smoothness')[:] = np.mean(np.abs(np.diff(control_signals, axis=1)), axis=1)
+
+    # 3. Robustez
+    column('max_control')[:] = np.max(abs_control, axis=1)
+    column('total_control_effort')[:] = np.sum(abs_control, axis=1)
+
+    # 4. Performance dinâmica (só para degrau)
+    column('overshoot')[:] = 0.0
+    column('settling_time')[:] = np.inf
+    column('rise_time')[:] = np.inf
+    if reference_type == 'step':
+        max_response = np.max(outputs, axis=1)
+        column('overshoot')[:] = np.where(max_response > reference_amplitude,
+                                          (max_response - reference_amplitude) / reference_amplitude * 100, 0.0)
+
+        # Settling time (2%): acomoda na amostra seguinte à última fora da faixa (NaN conta como fora)
+        tolerance = 0.02 * reference_amplitude
+        outside = ~(abs_error <= tolerance)
+        last_outside = num_samples - 1 - np.argmax(outside[:, ::-1], axis=1)
+        settled_index = np.where(outside.any(axis=1), last_outside + 1, 0)
+        column('settling_time')[:] = np.where(settled_index < num_samples,
+                                              times[np.minimum(settled_index, num_samples - 1)], np.inf)
+
+        # Rise time (10% to 90%)
+        above_10 = outputs >= 0.1 * reference_amplitude
+        above_90 = outputs >= 0.9 * reference_amplitude
+        rises = above_10.any(axis=1) & above_90.any(axis=1)
+        column('rise_time')[:] = np.where(rises, times[np.argmax(above_90, axis=1)] - times[np.argmax(above_10, axis=1)],
+                                          np.inf)
+
+    # 5. Eficiência energética
+    column('isu')[:] = np.sum(control_signals**2, axis=1) * t_sim_step
+    column('iae')[:] = np.sum(abs_error, axis=1) * t_sim_step
+    column('ise')[:] = np.sum(error_signals**2, axis=1) * t_sim_step
+    column('itae')[:] = np.sum(times * abs_error, axis=1) * t_sim_step
+
+    # 6. Consistência
+    column('steady_state_std')[:] = np.std(error_signals[:, num_samples // 2:], axis=1)
+
+    # Correlação de Pearson por linha (mesma conta do np.corrcoef, NaN quando um dos sinais é constante)
+    error_centered = error_signals - error_signals.mean(axis=1, keepdims=True)
+    control_centered = control_signals - control_signals.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = (np.sum(error_centered * control_centered, axis=1)
+                       / np.sqrt(np.sum(error_centered**2, axis=1) * np.sum(control_centered**2, axis=1)))
+    column('error_control_correlation')[:] = np.abs(np.clip(correlation, -1.0, 1.0))
+
+    return metrics
+
 def calculate_goodhart_metrics(pid_params):
     """
     Calcula múltiplas métricas independentes para evitar over-fitting
     Baseado na Lei de Goodhart: "Quando uma medida se torna um alvo, ela deixa de ser uma boa medida"
-    
+
     Retorna: dicionário com todas as métricas calculadas
     """
     kp, ki, kd = pid_params
-    
+
     # Verificar se os parâmetros estão dentro dos limites válidos
     if kp < 0 or ki < 0 or kd < 0:
         return None
-    
+
     try:
-        # Configurar simulação
-        time_vector = np.linspace(0, tf, n)
-        t_sim_step = time_vector[1] - time_vector[0]
-        
-        # Gerar referência
-        output_ref = generate_reference_signal(time_vector, reference_type, 
-                                             reference_amplitude, reference_frequency)
-        
-        if reference_type == 'sine':
-            output_dot_ref = reference_amplitude * reference_frequency * np.cos(reference_frequency * time_vector)
-        else:
-            output_dot_ref = np.gradient(output_ref, t_sim_step)
-        
-        # Condições iniciais
-        states0 = [0.0, 0.0]
-        states = np.zeros((n-1, 2))
-        control_signals = np.zeros(n-1)
-        
-        # Simular sistema e coletar sinais de controle
-        for i in range(n-1):
-            out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
-                              args=(output_ref[i], output_dot_ref[i], pid_params))
-            states0 = out_states[-1, :]
-            states[i] = out_states[-1, :]
-            
-            # Calcular sinal de controle
-            control_signals[i] = generic_controller(states[i, 0], output_ref[i], 
-                                                  output_dot_ref[i], states[i, 1], kp, ki, kd)
-        
-        # =============================================================================
-        # MÉTRICAS BASEADAS NA LEI DE GOODHART
-        # =============================================================================
-        
+        states, control_signals = simulate_closed_loop(pid_params)
+        _, _, output_ref, _ = current_reference()
         error_signal = output_ref[:-1] - states[:, 0]
-        
-        # 1. MÉTRICAS DE PRECISÃO (Accuracy)
-        rmse = np.sqrt(np.mean(error_signal**2))
-        mae = np.mean(np.abs(error_signal))  # Mean Absolute Error
-        max_error = np.max(np.abs(error_signal))
-        
-        # 2. MÉTRICAS DE ESTABILIDADE (Stability)
-        # Variância do erro (menor = mais estável)
-        error_variance = np.var(error_signal)
-        
-        # Variabilidade do sinal de controle (menor = mais suave)
-        control_variance = np.var(control_signals)
-        control_smoothness = np.mean(np.abs(np.diff(control_signals)))
-        
-        # 3. MÉTRICAS DE ROBUSTEZ (Robustness)
-        # Pico do sinal de controle (menor = menos agressivo)
-        max_control = np.max(np.abs(control_signals))
-        
-        # Esforço de controle total
-        total_control_effort = np.sum(np.abs(control_signals))
-        
-        # 4. MÉTRICAS DE PERFORMANCE DINÂMICA (Dynamic Performance)
-        overshoot = 0
-        settling_time = float('inf')
-        rise_time = float('inf')
-        
-        if reference_type == 'step':
-            max_response = np.max(states[:, 0])
-            if max_response > reference_amplitude:
-                overshoot = ((max_response - reference_amplitude) / reference_amplitude) * 100
-            
-            # Settling time (2% criteria)
-            tolerance = 0.02 * reference_amplitude
-            settled_indices = np.where(np.abs(error_signal) <= tolerance)[0]
-            if len(settled_indices) > 0:
-                # Verificar se permanece dentro da tolerância
-                for idx in settled_indices:
-                    if np.all(np.abs(error_signal[idx:]) <= tolerance):
-                        settling_time = time_vector[idx]
-                        break
-            
-            # Rise time (10% to 90%)
-            response_90 = 0.9 * reference_amplitude
-            response_10 = 0.1 * reference_amplitude
-            
-            idx_10 = np.where(states[:, 0] >= response_10)[0]
-            idx_90 = np.where(states[:, 0] >= response_90)[0]
-            
-            if len(idx_10) > 0 and len(idx_90) > 0:
-                rise_time = time_vector[idx_90[0]] - time_vector[idx_10[0]]
-        
-        # 5. MÉTRICAS DE EFICIÊNCIA ENERGÉTICA (Energy Efficiency)
-        # Integral do quadrado do sinal de controle (ISU - Integral of Squared Control)
-        isu = np.sum(control_signals**2) * t_sim_step
-        
-        # Integral do erro absoluto (IAE)
-        iae = np.sum(np.abs(error_signal)) * t_sim_step
-        
-        # Integral do erro quadrático (ISE)
-        ise = np.sum(error_signal**2) * t_sim_step
-        
-        # Integral do erro absoluto ponderado pelo tempo (ITAE)
-        itae = np.sum(time_vector[:-1] * np.abs(error_signal)) * t_sim_step
-        
-        # 6. MÉTRICAS DE CONSISTÊNCIA (Consistency)
-        # Desvio padrão do erro na segunda metade da simulação (steady-state performance)
-        mid_point = len(error_signal) // 2
-        steady_state_std = np.std(error_signal[mid_point:])
-        
-        # Correlação entre erro e sinal de controle (menor = melhor desacoplamento)
-        error_control_correlation = np.abs(np.corrcoef(error_signal, control_signals)[0, 1])
-        
-        return {
-            # Métricas de Precisão
-            'rmse': rmse,
-            'mae': mae,
-            'max_error': max_error,
-            
-            # Métricas de Estabilidade
-            'error_variance': error_variance,
-            'control_variance': control_variance,
-            'control_smoothness': control_smoothness,
-            
-            # Métricas de Robustez
-            'max_control': max_control,
-            'total_control_effort': total_control_effort,
-            
-            # Métricas de Performance Dinâmica
-            'overshoot': overshoot,
-            'settling_time': settling_time,
-            'rise_time': rise_time,
-            
-            # Métricas de Eficiência Energética
-            'isu': isu,
-            'iae': iae,
-            'ise': ise,
-            'itae': itae,
-            
-            # Métricas de Consistência
-            'steady_state_std': steady_state_std,
-            'error_control_correlation': error_control_correlation
-        }
-        
+        metrics = goodhart_metrics_batch(error_signal[None, :], control_signals[None, :], states[None, :, 0])
+        return dict(zip(metric_names, metrics[0]))
+
     except Exception as e:
         return None
 
+def cost_weight_vector(weights=None):
+    """Pesos divididos pelos fatores de normalização, na ordem de metric_names (métrica sem peso fica com 0)"""
+    weights = default_weights if weights is None else weights
+    return np.array([weights.get(name, 0.0) / normalization_factors.get(name, 1.0) for name in metric_names])
+
+def goodhart_cost_from_metrics(metrics, pid_params, weights=None):
+    """
+    Custo de Goodhart de N conjuntos de métricas (N, 17) e ganhos (N, 3): soma ponderada das métricas
+    normalizadas mais as penalidades especiais, vetorizada nas partículas.
+    A soma vai métrica por métrica (e não com @, cujo BLAS muda a ordem das somas com N), então o custo de uma
+    partícula tem os mesmos bits em qualquer tamanho de lote.
+    """
+    weight_vector = cost_weight_vector(weights)
+    total_cost = np.zeros(len(metrics))
+    for index in np.flatnonzero(weight_vector):  # métrica fora de weights não entra nem como 0 * inf
+        total_cost += metrics[:, index] * weight_vector[index]
+
+    # Penalidades especiais (Lei de Goodhart: evitar soluções extremas)
+    kp, ki, kd = np.asarray(pid_params, dtype=float).T
+    total_cost += np.where((kp > 50) | (ki > 20) | (kd > 10), 0.5, 0.0)            # parâmetros extremos
+    total_cost += np.where(metrics[:, metric_index['settling_time']] > 2 * tf, 1.0, 0.0)  # sistema muito lento
+    total_cost += np.where(metrics[:, metric_index['overshoot']] > 50, 0.5, 0.0)     # overshoot > 50%
+    total_cost += np.where(metrics[:, metric_index['max_control']] > 100, 0.3, 0.0)  # saturação
+    return total_cost
+
+def goodhart_cost_batch(pid_params_batch, weights=None):
+    """
+    Custo de Goodhart de um enxame (N, 3) de uma vez: simula os conjuntos de ganhos (simulate_closed_loop_swarm),
+    com os sinais em (N, n-1), e calcula métricas e custo em lote. Ganhos negativos e custo não finito
+    (malha que diverge) recebem a penalidade 1e6, como no except da versão por partícula.
+    """
+    gains = np.atleast_2d(np.asarray(pid_params_batch, dtype=float))
+    costs = np.full(len(gains), 1e6)
+    valid = np.all(gains >= 0, axis=1)
+    if not valid.any():
+        return costs
+
+    states, control_signals = simulate_closed_loop_swarm(gains[valid])
+    outputs = states[:, :, 0]
+    _, _, output_ref, _ = current_reference()
+
+    metrics = goodhart_metrics_batch(output_ref[:-1] - outputs, control_signals, outputs)
+    cost = goodhart_cost_from_metrics(metrics, gains[valid], weights)
+    costs[valid] = np.where(np.isfinite(cost), cost, 1e6)
+    return costs
+
 def goodhart_cost_function(pid_params, weights=None):
     """
     Função de custo baseada na Lei de Goodhart
-    
+
     Combina múltiplas métricas com pesos para evitar over-optimization de uma única métrica.
     Isso previne o problema da Lei de Goodhart onde otimizar uma métrica específica
     pode degradar a performance geral do sistema.
-    
+
     Args:
         pid_params: [kp, ki, kd]
-        weights: dict com pesos para cada métrica
-    
+        weights: dict com pesos para cada métrica (padrão: default_weights)
+
     Returns:
         custo total (menor é melhor)
     """
-    
-    # Pesos padrão baseados na importância relativa (Lei de Goodhart)
-    if weights is None:
-        weights = {
-            # Precisão (40% do peso total)
-            'rmse': 0.25,
-            'mae': 0.10,
-            'max_error': 0.05,
-            
-            # Estabilidade (25% do peso total)
-            'error_variance': 0.10,
-            'control_variance': 0.08,
-            'control_smoothness': 0.07,
-            
-            # Robustez (15% do peso total)
-            'max_control': 0.08,
-            'total_control_effort': 0.07,
-            
-            # Performance Dinâmica (10% do peso total)
-            'overshoot': 0.05,
-            'settling_time': 0.03,
-            'rise_time': 0.02,
-            
-            # Eficiência Energética (5% do peso total)
-            'isu': 0.02,
-            'iae': 0.01,
-            'ise': 0.01,
-            'itae': 0.01,
-            
-            # Consistência (5% do peso total)
-            'steady_state_std': 0.03,
-            'error_control_correlation': 0.02
-        }
-    
-    # Calcular métricas
-    metrics = calculate_goodhart_metrics(pid_params)
-    
-    if metrics is None:
-        return 1e6  # Penalidade para parâmetros inválidos
-    
-    # Normalizar métricas para evitar dominação por valores grandes
-    normalized_metrics = {}
-    
-    # Fatores de normalização (valores típicos esperados)
-    normalization_factors = {
-        'rmse': 1.0,
-        'mae': 1.0, 
-        'max_error': 2.0,
-        'error_variance': 0.1,
-        'control_variance': 100.0,
-        'control_smoothness': 10.0,
-        'max_control': 50.0,
-        'total_control_effort': 1000.0,
-        'overshoot': 50.0,  # percentage
-        'settling_time': 5.0,  # seconds
-        'rise_time': 2.0,  # seconds
-        'isu': 1000.0,
-        'iae': 10.0,
-        'ise': 5.0,
-        'itae': 50.0,
-        'steady_state_std': 0.1,
-        'error_control_correlation': 1.0
-    }
-    
-    # Normalizar e aplicar pesos
-    total_cost = 0.0
-    
-    for metric_name, metric_value in metrics.items():
-        if metric_name in weights:
-            # Normalizar métrica
-            norm_factor = normalization_factors.get(metric_name, 1.0)
-            normalized_value = metric_value / norm_factor
-            
-            # Aplicar peso e somar ao custo total
-            weighted_cost = weights[metric_name] * normalized_value
-            total_cost += weighted_cost
-    
-    # Penalidades especiais (Lei de Goodhart: evitar soluções extremas)
-    
-    # Penalidade por parâmetros muito altos (instabilidade)
-    kp, ki, kd = pid_params
-    if kp > 50 or ki > 20 or kd > 10:
-        total_cost += 0.5  # Penalidade por parâmetros extremos
-    
-    # Penalidade por settling time muito alto
-    if metrics['settling_time'] > 2 * tf:
-        total_cost += 1.0  # Sistema muito lento
-    
-    # Penalidade por overshoot excessivo
-    if metrics['overshoot'] > 50:  # mais de 50%
-        total_cost += 0.5
-    
-    # Penalidade por sinal de controle muito alto (saturação)
-    if metrics['max_control'] > 100:
-        total_cost += 0.3
-    
-    return total_cost
+    return float(goodhart_cost_batch([pid_params], weights)[0])
 
 # Função wrapper para compatibilidade com código existente
 def evaluate_pid(pid_params):
@@ -360,7 +402,15 @@ def evaluate_pid(pid_params):
 # =============================================================================
 
 class PSO:
-    def __init__(self, num_particles=30, num_iterations=50, bounds=None):
+    def __init__(self, num_particles=30, num_iterations=50, bounds=None, executor=None, seed=None):
+        """
+        executor: opcional, qualquer objeto com .map (ex.: concurrent.futures.ProcessPoolExecutor).
+        O enxame de cada iteração é dividido em um bloco por worker e cada bloco vai inteiro para
+        goodhart_cost_batch; sem executor o enxame todo é um bloco só, avaliado no processo principal.
+        seed: semente do gerador do PSO. Todo sorteio acontece no processo principal e os custos
+        voltam na ordem das partículas, então com a mesma semente o resultado é idêntico para
+        qualquer número de workers.
+        """
         self.num_particles = num_particles
         self.num_iterations = num_iterations
         self.bounds = bounds if bounds else [(0.1, 20), (0.0, 10), (0.0, 5)]  # [kp, ki, kd]
@@ -371,15 +421,18 @@ class PSO:
         self.c1 = 1.5       # componente cognitiva
         self.c2 = 1.5       # componente social
         
+        self.executor = executor
+        self.rng = np.random.default_rng(seed)
+        
         # Inicializar enxame
-        self.particles = np.random.uniform(
+        self.particles = self.rng.uniform(
             low=[b[0] for b in self.bounds],
             high=[b[1] for b in self.bounds],
             size=(num_particles, self.dimension)
         )
         
         # Velocidades iniciais
-        self.velocities = np.random.uniform(-1, 1, (num_particles, self.dimension))
+        self.velocities = self.rng.uniform(-1, 1, (num_particles, self.dimension))
         
         # Melhores posições
         self.personal_best = self.particles.copy()
@@ -390,6 +443,20 @@ class PSO:
         
         # Histórico
         self.cost_history = []
+        self.iteration_times = []
+        self.evaluation_times = []
+        
+    def evaluate_particles(self):
+        """
+        Avalia todas as partículas com goodhart_cost_batch, no processo principal ou em blocos no executor,
+        preservando a ordem. O custo de uma partícula não depende do tamanho do lote em que ela está,
+        então o resultado é o mesmo bit a bit com ou sem executor.
+        """
+        if self.executor is None:
+            return goodhart_cost_batch(self.particles)
+        num_blocks = min(len(self.particles), getattr(self.executor, '_max_workers', None) or os.cpu_count() or 1)
+        blocks = np.array_split(self.particles, num_blocks)
+        return np.concatenate(list(self.executor.map(goodhart_cost_batch, blocks)))
         
     def optimize(self):
         """Executar otimização PSO"""
@@ -407,8 +474,12 @@ class PSO:
             iter_start = time.time()
             
             # Avaliar todas as partículas
+            eval_start = time.time()
+            costs = self.evaluate_particles()
+            eval_time = time.time() - eval_start
+            
             for i in range(self.num_particles):
-                cost = evaluate_pid(self.particles[i])
+                cost = costs[i]
                 
                 # Atualizar melhor pessoal
                 if cost < self.personal_best_cost[i]:
@@ -423,8 +494,8 @@ class PSO:
             # Atualizar velocidades e posições
             for i in range(self.num_particles):
                 # Componentes aleatórios
-                r1 = np.random.random(self.dimension)
-                r2 = np.random.random(self.dimension)
+                r1 = self.rng.random(self.dimension)
+                r2 = self.rng.random(self.dimension)
                 
                 # Atualizar velocidade
                 self.velocities[i] = (
@@ -448,16 +519,21 @@ class PSO:
             self.cost_history.append(self.global_best_cost)
             
             iter_time = time.time() - iter_start
+            self.iteration_times.append(iter_time)
+            self.evaluation_times.append(eval_time)
             
             # Progresso
             if (iteration + 1) % 5 == 0 or iteration == 0:
                 print(f"Iteração {iteration+1:2d}/{self.num_iterations} | "
                       f"Melhor custo: {self.global_best_cost:.6f} | "
-                      f"Tempo: {iter_time:.2f}s")
+                      f"Tempo: {iter_time:.2f}s (avaliação: {eval_time:.2f}s)")
                 print(f"    Kp={self.global_best[0]:.3f}, Ki={self.global_best[1]:.3f}, Kd={self.global_best[2]:.3f}")
         
         total_time = time.time() - start_time
         print(f"\nOtimização concluída em {total_time:.2f} segundos")
+        print(f"Tempo médio por iteração: {np.mean(self.iteration_times):.3f}s "
+              f"(avaliação: {np.mean(self.evaluation_times):.3f}s, "
+              f"{'serial' if self.executor is None else type(self.executor).__name__})")
         
         return self.global_best, self.global_best_cost
 
@@ -536,8 +612,13 @@ def run_optimization():
     
     # Executar PSO
     print(f"\n{'='*60}")
-    pso = PSO(num_particles=25, num_iterations=40)  # Mais iterações para Goodhart
-    best_params, best_cost = pso.optimize()
+    if num_workers:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pso = PSO(num_particles=25, num_iterations=40, executor=executor, seed=random_seed)  # Mais iterações para Goodhart
+            best_params, best_cost = pso.optimize()
+    else:
+        pso = PSO(num_particles=25, num_iterations=40, seed=random_seed)  # Mais iterações para Goodhart
+        best_params, best_cost = pso.optimize()
     
     print("\n=== RESULTADOS DA OTIMIZAÇÃO GOODHART ===")
     print(f"Melhores parâmetros encontrados:")
@@ -863,14 +944,7 @@ def compare_results(original_params, optimized_params):
     results = {}
     
     for name, params in [("Original", original_params), ("Otimizado", optimized_params)]:
-        states0 = [0.0, 0.0]
-        states = np.zeros((n-1, 2))
-        
-        for i in range(n-1):
-            out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
-                              args=(output_ref[i], output_dot_ref[i], params))
-            states0 = out_states[-1, :]
-            states[i] = out_states[-1, :]
+        states, _ = simulate_closed_loop(params)
         
         error_signal = output_ref[:-1] - states[:, 0]
         rmse = np.sqrt(np.mean(error_signal**2))
@@ -8,8 +8,11 @@
 """
 
 import numpy as np
+import os
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
+from concurrent.futures import ProcessPoolExecutor
+from generic_loop_engine import simulate_closed_loop_batch
 import time
 
 # CONFIGURAÇÃO DO SISTEMA DE CONTROLE
@@ -27,6 +30,11 @@ reference_type = 'step'  # melhor para avaliar performance PID
 reference_amplitude = 1.0
 reference_frequency = 1.0
 
+# Avaliação paralela das partículas (None = serial, ex.: os.cpu_count() nas máquinas de tuning)
+num_workers = None
+random_seed = None  # semente do PSO; com semente o resultado não depende de num_workers
+integrator = 'discrete'  # 'discrete' (generic_loop_engine, passo exato) ou 'odeint' (referência para validação)
+
 print(" OTIMIZAÇÃO PID")
 print(f"Sistema: dx/dt = -{plant_a}*x + {plant_b}*u")
 print(f"Referência: {reference_type}")
@@ -72,83 +80,117 @@ def connected_systems_model(states, t, output_ref, output_dot_ref, pid_params):
     
     return [system_output_dot, integral_error_dot]
 
+def reference_signals():
+    """Referência e derivada da referência da configuração atual (tf, n, reference_type, ...)"""
+    time_vector = np.linspace(0, tf, n)
+    t_sim_step = time_vector[1] - time_vector[0]
+    output_ref = generate_reference_signal(time_vector, reference_type, 
+                                         reference_amplitude, reference_frequency)
+    
+    if reference_type == 'sine':
+        output_dot_ref = reference_amplitude * reference_frequency * np.cos(reference_frequency * time_vector)
+    else:
+        output_dot_ref = np.gradient(output_ref, t_sim_step)
+    return output_ref, output_dot_ref
+
+def simulate_closed_loop_swarm(gains, output_ref, output_dot_ref, engine=None):
+    """
+    Simula N conjuntos de ganhos (N, 3); retorna estados (N, n-1, 2) e sinais de controle (N, n-1).
+    engine: 'discrete' avança o enxame inteiro junto pelo generic_loop_engine; 'odeint' simula um por um.
+    Sem engine usa o global integrator.
+    """
+    engine = integrator if engine is None else engine
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    if engine == 'discrete':
+        return simulate_closed_loop_batch(gains, output_ref, output_dot_ref, tf/n,
+                                          plant_a, plant_b, plant_a_error, plant_b_error)
+    elif engine == 'odeint':
+        simulations = [simulate_closed_loop_odeint(params, output_ref, output_dot_ref) for params in gains]
+        return np.array([states for states, _ in simulations]), np.array([control for _, control in simulations])
+    else:
+        raise ValueError(f"Integrador '{engine}' não implementado")
+
+def simulate_closed_loop(pid_params, output_ref, output_dot_ref, engine=None):
+    """Simula um conjunto de ganhos; retorna estados (n-1, 2) e sinais de controle (n-1,)"""
+    states, control_signals = simulate_closed_loop_swarm([pid_params], output_ref, output_dot_ref, engine)
+    return states[0], control_signals[0]
+
+def simulate_closed_loop_odeint(pid_params, output_ref, output_dot_ref):
+    """Simula o sistema com odeint, um passo por amostra (referência para validar o motor discreto)"""
+    kp, ki, kd = pid_params
+    states0 = [0.0, 0.0]
+    states = np.zeros((n-1, 2))
+    control_signals = np.zeros(n-1)
+    for i in range(n-1):
+        out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
+                          args=(output_ref[i], output_dot_ref[i], pid_params))
+        states0 = out_states[-1, :]
+        states[i] = out_states[-1, :]
+        control_signals[i] = generic_controller(states[i, 0], output_ref[i], output_dot_ref[i],
+                                              states[i, 1], kp, ki, kd)
+    return states, control_signals
+
 # FUNÇÃO OBJETIVO PARA PSO
 
+def evaluate_pid_batch(pid_params_batch):
+    """
+    Avalia a performance de N conjuntos de parâmetros PID (N, 3) numa simulação só
+    Retorna: custos (N,), menor é melhor
+    """
+    gains = np.atleast_2d(np.asarray(pid_params_batch, dtype=float))
+    
+    # Verificar se os parâmetros estão dentro dos limites válidos
+    costs = np.full(len(gains), 1e6)  # penalidade alta para valores inválidos
+    valid = np.all(gains >= 0, axis=1)
+    if not valid.any():
+        return costs
+    
+    # Simular sistema (o sinal de controle sai da mesma simulação)
+    output_ref, output_dot_ref = reference_signals()
+    states, control_signals = simulate_closed_loop_swarm(gains[valid], output_ref, output_dot_ref)
+    outputs = states[:, :, 0]
+    
+    # Calcular métricas de performance
+    error_signal = output_ref[:-1] - outputs
+    
+    # RMSE (objetivo principal)
+    rmse = np.sqrt(np.mean(error_signal**2, axis=1))
+    
+    # Penalidades adicionais
+    overshoot = np.zeros(len(outputs))
+    if reference_type == 'step':
+        # Calcular overshoot para step response
+        max_response = np.max(outputs, axis=1)
+        overshoot = np.where(max_response > reference_amplitude,
+                             (max_response - reference_amplitude) / reference_amplitude, 0.0)
+    
+    # Penalidade por control effort excessivo
+    control_effort = np.mean(np.abs(control_signals), axis=1)
+    
+    # Função de custo combinada; malha que diverge (custo inf/nan) recebe a mesma penalidade alta
+    cost = rmse + 0.1 * overshoot + 0.01 * np.maximum(0, control_effort - 10)
+    costs[valid] = np.where(np.isfinite(cost), cost, 1e6)
+    return costs
+
 def evaluate_pid(pid_params):
     """
     Avalia a performance de um conjunto de parâmetros PID
     Retorna: custo (menor é melhor)
     """
-    kp, ki, kd = pid_params
-    
-    # Verificar se os parâmetros estão dentro dos limites válidos
-    if kp < 0 or ki < 0 or kd < 0:
-        return 1e6  # penalidade alta para valores inválidos
-    
-    try:
-        # Configurar simulação
-        time_vector = np.linspace(0, tf, n)
-        t_sim_step = time_vector[1] - time_vector[0]
-        
-        # Gerar referência
-        output_ref = generate_reference_signal(time_vector, reference_type, 
-                                             reference_amplitude, reference_frequency)
-        
-        if reference_type == 'sine':
-            output_dot_ref = reference_amplitude * reference_frequency * np.cos(reference_frequency * time_vector)
-        else:
-            output_dot_ref = np.gradient(output_ref, t_sim_step)
-        
-        # Condições iniciais
-        states0 = [0.0, 0.0]
-        states = np.zeros((n-1, 2))
-        
-        # Simular sistema
-        for i in range(n-1):
-            out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
-                              args=(output_ref[i], output_dot_ref[i], pid_params))
-            states0 = out_states[-1, :]
-            states[i] = out_states[-1, :]
-        
-        # Calcular métricas de performance
-        error_signal = output_ref[:-1] - states[:, 0]
-        
-        # RMSE (objetivo principal)
-        rmse = np.sqrt(np.mean(error_signal**2))
-        
-        # Penalidades adicionais
-        max_error = np.max(np.abs(error_signal))
-        overshoot = 0
-        
-        if reference_type == 'step':
-            # Calcular overshoot para step response
-            max_response = np.max(states[:, 0])
-            if max_response > reference_amplitude:
-                overshoot = (max_response - reference_amplitude) / reference_amplitude
-        
-        # Penalidade por control effort excessivo
-        control_effort = 0
-        for i in range(len(states)):
-            if i < len(output_ref)-1:
-                u = generic_controller(states[i, 0], output_ref[i], output_dot_ref[i], 
-                                     states[i, 1], kp, ki, kd)
-                control_effort += abs(u)
-        
-        control_effort = control_effort / len(states)
-        
-        # Função de custo combinada
-        cost = rmse + 0.1 * overshoot + 0.01 * max(0, control_effort - 10)
-        
-        return cost
-        
-    except Exception as e:
-        # Se houver erro na simulação, retornar custo alto
-        return 1e6
+    return float(evaluate_pid_batch([pid_params])[0])
 
 # ALGORITMO PSO
 
 class PSO:
-    def __init__(self, num_particles=30, num_iterations=50, bounds=None):
+    def __init__(self, num_particles=30, num_iterations=50, bounds=None, executor=None, seed=None):
+        """
+        executor: opcional, qualquer objeto com .map (ex.: concurrent.futures.ProcessPoolExecutor).
+        O enxame de cada iteração é dividido em um bloco por worker e cada bloco vai inteiro para
+        evaluate_pid_batch; sem executor o enxame todo é um bloco só, avaliado no processo principal.
+        seed: semente do gerador do PSO. Todo sorteio acontece no processo principal e os custos
+        voltam na ordem das partículas, então com a mesma semente o resultado é idêntico para
+        qualquer número de workers.
+        """
         self.num_particles = num_particles
         self.num_iterations = num_iterations
         self.bounds = bounds if bounds else [(0.1, 20), (0.0, 10), (0.0, 5)]  # [kp, ki, kd]
@@ -159,15 +201,18 @@ class PSO:
         self.c1 = 1.5       # componente cognitiva
         self.c2 = 1.5       # componente social
         
+        self.executor = executor
+        self.rng = np.random.default_rng(seed)
+        
         # Inicializar enxame
-        self.particles = np.random.uniform(
+        self.particles = self.rng.uniform(
             low=[b[0] for b in self.bounds],
             high=[b[1] for b in self.bounds],
             size=(num_particles, self.dimension)
         )
         
         # Velocidades iniciais
-        self.velocities = np.random.uniform(-1, 1, (num_particles, self.dimension))
+        self.velocities = self.rng.uniform(-1, 1, (num_particles, self.dimension))
         
         # Melhores posições
         self.personal_best = self.particles.copy()
@@ -178,6 +223,20 @@ class PSO:
         
         # Histórico
         self.cost_history = []
+        self.iteration_times = []
+        self.evaluation_times = []
+        
+    def evaluate_particles(self):
+        """
+        Avalia todas as partículas com evaluate_pid_batch, no processo principal ou em blocos no executor,
+        preservando a ordem. O custo de uma partícula não depende do tamanho do lote em que ela está,
+        então o resultado é o mesmo bit a bit com ou sem executor.
+        """
+        if self.executor is None:
+            return evaluate_pid_batch(self.particles)
+        num_blocks = min(len(self.particles), getattr(self.executor, '_max_workers', None) or os.cpu_count() or 1)
+        blocks = np.array_split(self.particles, num_blocks)
+        return np.concatenate(list(self.executor.map(evaluate_pid_batch, blocks)))
         
     def optimize(self):
         """Executar otimização PSO"""
@@ -195,8 +254,12 @@ class PSO:
             iter_start = time.time()
             
             # Avaliar todas as partículas
+            eval_start = time.time()
+            costs = self.evaluate_particles()
+            eval_time = time.time() - eval_start
+            
             for i in range(self.num_particles):
-                cost = evaluate_pid(self.particles[i])
+                cost = costs[i]
                 
                 # Atualizar melhor pessoal
                 if cost < self.personal_best_cost[i]:
@@ -211,8 +274,8 @@ class PSO:
             # Atualizar velocidades e posições
             for i in range(self.num_particles):
                 # Componentes aleatórios
-                r1 = np.random.random(self.dimension)
-                r2 = np.random.random(self.dimension)
+                r1 = self.rng.random(self.dimension)
+                r2 = self.rng.random(self.dimension)
                 
                 # Atualizar velocidade
                 self.velocities[i] = (
@@ -236,16 +299,21 @@ class PSO:
             self.cost_history.append(self.global_best_cost)
             
             iter_time = time.time() - iter_start
+            self.iteration_times.append(iter_time)
+            self.evaluation_times.append(eval_time)
             
             # Progresso
             if (iteration + 1) % 5 == 0 or iteration == 0:
                 print(f"Iteração {iteration+1:2d}/{self.num_iterations} | "
                       f"Melhor custo: {self.global_best_cost:.6f} | "
-                      f"Tempo: {iter_time:.2f}s")
+                      f"Tempo: {iter_time:.2f}s (avaliação: {eval_time:.2f}s)")
                 print(f"    Kp={self.global_best[0]:.3f}, Ki={self.global_best[1]:.3f}, Kd={self.global_best[2]:.3f}")
         
         total_time = time.time() - start_time
         print(f"\nOtimização concluída em {total_time:.2f} segundos")
+        print(f"Tempo médio por iteração: {np.mean(self.iteration_times):.3f}s "
+              f"(avaliação: {np.mean(self.evaluation_times):.3f}s, "
+              f"{'serial' if self.executor is None else type(self.executor).__name__})")
         
         return self.global_best, self.global_best_cost
 
@@ -264,8 +332,13 @@ def run_optimization():
     print()
     
     # Executar PSO
-    pso = PSO(num_particles=20, num_iterations=30)
-    best_params, best_cost = pso.optimize()
+    if num_workers:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pso = PSO(num_particles=20, num_iterations=30, executor=executor, seed=random_seed)
+            best_params, best_cost = pso.optimize()
+    else:
+        pso = PSO(num_particles=20, num_iterations=30, seed=random_seed)
+        best_params, best_cost = pso.optimize()
     
     print("\n RESULTADOS")
     print(f"Melhores parâmetros encontrados:")
@@ -296,14 +369,7 @@ def compare_results(original_params, optimized_params):
     results = {}
     
     for name, params in [("Original", original_params), ("Otimizado", optimized_params)]:
-        states0 = [0.0, 0.0]
-        states = np.zeros((n-1, 2))
-        
-        for i in range(n-1):
-            out_states = odeint(connected_systems_model, states0, [0.0, tf/n],
-                              args=(output_ref[i], output_dot_ref[i], params))
-            states0 = out_states[-1, :]
-            states[i] = out_states[-1, :]
+        states, _ = simulate_closed_loop(params, output_ref, output_dot_ref)
         
         error_signal = output_ref[:-1] - states[:, 0]
         rmse = np.sqrt(np.mean(error_signal**2))